@@ -0,0 +1,7 @@
+#!/bin/sh
+# local helper (not committed)
+cd /root/package/yatube && python manage.py test 2>&1 | tail -4
+cd /root/package && PYTHONPATH=yatube python -m pytest -q -p no:warnings 2>&1 | tail -2
+flake8 yatube --max-line-length=79 --config=setup.cfg | head -20
+rm -rf /root/package/yatube/media
+rm -f /root/package/yatube/db.sqlite3
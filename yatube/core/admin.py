@@ -0,0 +1,31 @@
+from django.contrib import admin
+
+from .models import EdgePurge, OutgoingMail, StoredFile
+
+
+class OutgoingMailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'subject', 'to', 'status', 'attempts', 'next_attempt_at')
+    list_filter = ('status',)
+    search_fields = ('=to',)
+    readonly_fields = ('created', 'sent_at', 'last_error')
+
+
+admin.site.register(OutgoingMail, OutgoingMailAdmin)
+
+
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'refcount')
+    search_fields = ('=name',)
+    readonly_fields = ('name',)
+
+
+admin.site.register(StoredFile, StoredFileAdmin)
+
+
+class EdgePurgeAdmin(admin.ModelAdmin):
+    list_display = ('tag', 'created')
+    search_fields = ('=tag',)
+
+
+admin.site.register(EdgePurge, EdgePurgeAdmin)
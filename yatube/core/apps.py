@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import auth, checks, edge_cache, profiling  # noqa: F401
+
+        if profiling.get_setting('ENABLED'):
+            profiling.install()
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY, get_user_model)
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+
+USER_CACHE_TIMEOUT = 300
+# Хеш пароля в кеш не попадает: сессия сверяется с сохранённым хешем сессии.
+SNAPSHOT_EXCLUDE = ('password',)
+SESSION_HASH = '_session_hash'
+
+User = get_user_model()
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def snapshot(user):
+    """Значения собственных полей пользователя без связанных объектов
+    и без хеша пароля, вместо которого хранится хеш сессии."""
+    values = {field.attname: getattr(user, field.attname)
+              for field in User._meta.concrete_fields
+              if field.attname not in SNAPSHOT_EXCLUDE}
+    values[SESSION_HASH] = user.get_session_auth_hash()
+    return values
+
+
+def from_snapshot(values):
+    """Пользователь и хеш сессии из снимка; пароль остаётся отложенным
+    полем и при обращении загружается из базы."""
+    values = dict(values)
+    session_hash = values.pop(SESSION_HASH, None)
+    user = User.from_db(
+        User.objects.db, list(values), list(values.values()))
+    return user, session_hash
+
+
+def invalidate_user(*user_ids):
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+def get_user(request):
+    """Как django.contrib.auth.get_user, но пользователь берётся из кеша.
+
+    Из кеша принимается только активный пользователь с совпадающим хешем
+    сессии; все остальные случаи (в том числе сброс сессии после смены
+    пароля) разбирает стандартная функция.
+    """
+    try:
+        user_id = request.session[SESSION_KEY]
+        backend = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+    key = user_cache_key(user_id)
+    values = cache.get(key)
+    if values is not None and backend in settings.AUTHENTICATION_BACKENDS:
+        user, cached_hash = from_snapshot(values)
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if (user.is_active and session_hash and cached_hash
+                and constant_time_compare(session_hash, cached_hash)):
+            user.backend = backend
+            return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, snapshot(user), USER_CACHE_TIMEOUT)
+    return user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_saved_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
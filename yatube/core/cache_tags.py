@@ -0,0 +1,59 @@
+"""Инвалидация закешированных данных по тегам.
+
+Каждому тегу соответствует версия в общем кеше. Запись хранит версии
+своих тегов на момент сохранения и считается устаревшей, как только
+версия любого из них изменилась.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.dispatch import Signal
+
+tags_invalidated = Signal(providing_args=['tags'])
+
+
+def _key(tag):
+    return f'tag:{tag}'
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def get_versions(tags):
+    keys = {_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    versions = {}
+    for key, tag in keys.items():
+        if key not in found:
+            cache.add(key, _new_version(), None)
+            found[key] = cache.get(key)
+        versions[tag] = found[key]
+    return versions
+
+
+def invalidate(*tags):
+    if not tags:
+        return
+    cache.set_many({_key(tag): _new_version() for tag in tags}, None)
+    tags_invalidated.send(sender=None, tags=tags)
+
+
+def set_tagged(key, value, tags, timeout=None):
+    cache.set(key, (get_versions(tags), value), timeout)
+
+
+def get_tagged(key):
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    versions, value = entry
+    if get_versions(versions) != versions:
+        return None
+    return value
+
+
+def tag_response(response, *tags):
+    """Помечает ответ тегами, по которым его можно инвалидировать."""
+    response.cache_tags = getattr(response, 'cache_tags', set()) | set(tags)
+    return response
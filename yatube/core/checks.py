@@ -0,0 +1,42 @@
+"""Проверки настроек, без которых сайт нельзя запускать в нескольких
+процессах."""
+from django.conf import settings
+from django.core.checks import Error, Tags, register, run_checks
+from django.core.exceptions import ImproperlyConfigured
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_process_local(alias='default'):
+    return settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Кеш по умолчанию должен быть общим для всех процессов: в нём лежат
+    сессии, версии тегов, буферы счётчиков и ограничения частоты, а
+    команды вроде flush_counters и process_deletions работают в своих
+    процессах."""
+    if getattr(settings, 'CACHE_ALLOW_PROCESS_LOCAL', False):
+        return []
+    if not is_process_local():
+        return []
+    return [Error(
+        'Кеш по умолчанию хранится в памяти процесса.',
+        hint='Укажите в CACHES общий для процессов кеш (memcached) '
+             'или включите CACHE_ALLOW_PROCESS_LOCAL для разработки.',
+        id='core.E001',
+    )]
+
+
+def require_shared_cache():
+    """Не даёт запустить WSGI-процесс без общего кеша: при загрузке
+    приложения Django системные проверки не выполняет."""
+    errors = [error for error in run_checks(tags=[Tags.caches])
+              if error.is_serious()]
+    if errors:
+        raise ImproperlyConfigured(
+            '; '.join(f'{error.id}: {error.msg}' for error in errors))
@@ -0,0 +1,60 @@
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSORS = {
+    'gzip': compress_string,
+}
+if brotli is not None:
+    COMPRESSORS['br'] = brotli.compress
+
+# Предпочтительный порядок: brotli сжимает текст лучше gzip.
+PREFERRED_ENCODINGS = ('br', 'gzip')
+FILE_EXTENSIONS = {
+    'br': '.br',
+    'gzip': '.gz',
+}
+
+
+def parse_accept_encoding(header):
+    """Значения q из Accept-Encoding: {'gzip': 1.0, 'br': 0.0, ...}.
+    Элементы с неверным q пропускаются."""
+    qvalues = {}
+    for item in header.split(','):
+        name, *params = item.split(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = None
+        if q is not None:
+            qvalues[name] = q
+    return qvalues
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding, которые мы умеем отдавать, в порядке
+    предпочтения клиента, а при равном q — нашего. q=0 запрещает
+    кодировку, '*' задаёт q для не перечисленных явно."""
+    qvalues = parse_accept_encoding(
+        request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    default = qvalues.get('*', 0)
+    encodings = [
+        (qvalues.get(encoding, default), -index, encoding)
+        for index, encoding in enumerate(PREFERRED_ENCODINGS)
+        if encoding in COMPRESSORS]
+    return [encoding for q, _, encoding in sorted(encodings, reverse=True)
+            if q > 0]
+
+
+def compress(data, encoding):
+    return COMPRESSORS[encoding](data)
@@ -0,0 +1,154 @@
+"""Счётчики с отложенной записью в базу.
+
+Приращения копятся в общем кеше, а команда flush_counters периодически
+переносит их в поле модели одним UPDATE ... CASE на порцию объектов.
+Чтение складывает сохранённое значение с ещё не записанным.
+
+Объекты с приращениями перечисляются в журнале: номер записи берётся из
+общего счётчика, а пометка dirty не даёт записать объект в журнал
+повторно до сброса. Пометка живёт ограниченное время, поэтому запись,
+потерянная при вытеснении из кеша, со временем появится снова.
+
+Приращения и уменьшения копятся в двух отдельных неотрицательных буферах
+(added и removed), а записывается их разность. Отрицательное приращение
+в кеше использовать нельзя: memcached не опускает значение ниже нуля, а
+для отсутствующего ключа молча ничего не делает.
+
+Буфер должен лежать в кеше, общем для сайта и команды flush_counters
+(см. core.checks). Приращение, потерянное при вытеснении, может сделать
+сумму отрицательной, поэтому значение поля не опускается ниже нуля.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = {}
+DIRTY_TIMEOUT = 60 * 60
+FLUSH_BATCH_SIZE = 500
+
+
+class BufferedCounter:
+    def __init__(self, name, model, field):
+        self.name = name
+        self.model = model
+        self.field = field
+        COUNTERS[name] = self
+
+    def _key(self, *parts):
+        return ':'.join(('counter', self.name) + tuple(map(str, parts)))
+
+    def _incr(self, key, delta):
+        """Увеличивает значение в кеше; delta должна быть положительной."""
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            cache.add(key, 0, None)
+            return cache.incr(key, delta)
+
+    def _buffer_key(self, pk, delta):
+        return self._key('added' if delta > 0 else 'removed', pk)
+
+    def incr(self, pk, delta=1):
+        if not delta:
+            return
+        self._incr(self._buffer_key(pk, delta), abs(delta))
+        if cache.add(self._key('dirty', pk), 1, DIRTY_TIMEOUT):
+            slot = self._incr(self._key('seq'), 1)
+            cache.set(self._key('log', slot), pk, None)
+
+    def get(self, pk):
+        """Ещё не записанное в базу приращение."""
+        return self.get_many([pk])[pk]
+
+    def get_many(self, pks):
+        keys = {pk: (self._key('added', pk), self._key('removed', pk))
+                for pk in pks}
+        values = cache.get_many(
+            [key for pair in keys.values() for key in pair])
+        return {pk: values.get(added, 0) - values.get(removed, 0)
+                for pk, (added, removed) in keys.items()}
+
+    def total(self, obj):
+        return getattr(obj, self.field) + self.get(obj.pk)
+
+    def _take(self, key):
+        """Забирает значение буфера. Вычитается ровно прочитанное: буфер
+        только растёт, поэтому значение не упирается в ноль."""
+        value = cache.get(key, 0)
+        if value:
+            try:
+                cache.decr(key, value)
+            except ValueError:
+                # Буфер вытеснен из кеша после чтения.
+                pass
+        return value
+
+    def _take_pending(self):
+        last = cache.get(self._key('seq'), 0)
+        first = cache.get(self._key('flushed'), 0) + 1
+        if first > last + 1:
+            # Номер журнала начался заново (например, после очистки кеша).
+            first = 1
+        log_keys = [self._key('log', slot) for slot in range(first, last + 1)]
+        pks = set(cache.get_many(log_keys).values())
+        cache.delete_many(log_keys)
+        cache.set(self._key('flushed'), last, None)
+        deltas = {}
+        for pk in pks:
+            # Пометку снимаем до чтения значения: приращение, пришедшее
+            # после этого, снова попадёт в журнал.
+            cache.delete(self._key('dirty', pk))
+            value = (self._take(self._key('added', pk))
+                     - self._take(self._key('removed', pk)))
+            if value:
+                deltas[pk] = value
+        return deltas
+
+    def _update(self, batch):
+        field = F(self.field)
+        self.model._base_manager.filter(
+            pk__in=[pk for pk, _ in batch]).update(**{
+                self.field: Case(
+                    *(When(pk=pk, then=Greatest(field + delta, Value(0)))
+                      for pk, delta in batch),
+                    default=field)})
+
+    def _update_each(self, batch):
+        """Записывает порцию по одному объекту; приращения, которые база
+        отвергает, пишутся в журнал и отбрасываются, чтобы не ломать
+        следующие сбросы."""
+        for pk, delta in batch:
+            try:
+                with transaction.atomic():
+                    self._update([(pk, delta)])
+            except IntegrityError:
+                logger.exception(
+                    'Приращение %s счётчика %s для объекта %s отброшено',
+                    delta, self.name, pk)
+
+    def flush(self, batch_size=FLUSH_BATCH_SIZE):
+        """Записывает накопленные приращения, возвращает их словарь."""
+        deltas = self._take_pending()
+        items = list(deltas.items())
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            try:
+                self._update(batch)
+            except IntegrityError:
+                self._update_each(batch)
+            except DatabaseError:
+                # База недоступна: возвращаем незаписанные приращения.
+                for pk, delta in items[start:]:
+                    self.incr(pk, delta)
+                raise
+        return deltas
+
+
+def flush_all(batch_size=FLUSH_BATCH_SIZE):
+    return {name: counter.flush(batch_size)
+            for name, counter in COUNTERS.items()}
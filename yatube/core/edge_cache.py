@@ -0,0 +1,87 @@
+"""Заголовки для кеширующего прокси перед сайтом и его очистка по тегам.
+
+Политика кеширования задаётся для каждого представления в CACHE_POLICIES.
+Теги ответа (tag_response) уходят прокси в заголовке Surrogate-Key, а при
+инвалидации тегов прокси получает запрос PURGE с этими же ключами.
+Запросы к прокси шлёт не сайт, а команда purge_edge_cache: ключи копятся
+в очереди EdgePurge и уходят вместе с данными в одной транзакции.
+"""
+import logging
+import urllib.request
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from . import metrics
+from .cache_tags import tags_invalidated
+from .models import EdgePurge
+
+logger = logging.getLogger(__name__)
+
+PRIVATE_CACHE_CONTROL = 'private, no-store'
+PURGE_TIMEOUT = 2
+BATCH_SIZE = 500
+
+
+def get_policy(view_name):
+    return getattr(settings, 'CACHE_POLICIES', {}).get(view_name)
+
+
+def public_cache_control(policy):
+    directives = ['public', f'max-age={policy["max_age"]}']
+    if policy.get('stale_while_revalidate'):
+        directives.append(
+            f'stale-while-revalidate={policy["stale_while_revalidate"]}')
+    return ', '.join(directives)
+
+
+def surrogate_keys(tags):
+    return ' '.join(sorted(tags))
+
+
+def get_setting(name, default=None):
+    return getattr(settings, 'EDGE_CACHE', {}).get(name, default)
+
+
+def purge(tags):
+    """Просит прокси выбросить все ответы с любым из ключей tags."""
+    url = get_setting('PURGE_URL')
+    if not url or not tags:
+        return False
+    request = urllib.request.Request(
+        url, method='PURGE', headers={'Surrogate-Key': surrogate_keys(tags)})
+    try:
+        with urllib.request.urlopen(
+                request, timeout=get_setting('TIMEOUT', PURGE_TIMEOUT)):
+            pass
+    except OSError as error:
+        metrics.incr('edge_cache.purge.error')
+        logger.warning('Не удалось очистить кеш прокси: %s', error)
+        return False
+    metrics.incr('edge_cache.purge')
+    return True
+
+
+def enqueue(tags):
+    EdgePurge.objects.bulk_create(EdgePurge(tag=tag) for tag in set(tags))
+
+
+def process_pending(batch_size=BATCH_SIZE):
+    """Отправляет прокси ключи из очереди. Возвращает число записей.
+
+    Записи удаляются только после удачного запроса, а ключи, добавленные
+    во время него, остаются в очереди до следующего прохода.
+    """
+    queued = list(EdgePurge.objects.values_list('pk', 'tag')[:batch_size])
+    if not queued or not purge({tag for _, tag in queued}):
+        return 0
+    EdgePurge.objects.filter(pk__in=[pk for pk, _ in queued]).delete()
+    return len(queued)
+
+
+@receiver(tags_invalidated)
+def queue_invalidated(sender, tags, **kwargs):
+    # Очередь пишется в транзакции изменения: прокси очищается только
+    # после коммита и не успеет закешировать старые данные.
+    if get_setting('PURGE_URL') and tags:
+        enqueue(tags)
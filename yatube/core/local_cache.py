@@ -0,0 +1,91 @@
+"""Кеш поиска объектов в памяти процесса.
+
+Записи вытесняются по LRU и живут не дольше timeout. Версия пространства
+имён хранится в общем кеше: invalidate() меняет её, и остальные процессы
+сбрасывают свои копии, как только заметят новую версию (кеш должен быть
+общим, см. core.checks). Общий кеш читается не чаще раза в
+check_interval секунд, поэтому обычный поиск — это обращение к словарю.
+
+Значения не копируются и общие для всех потоков процесса: кешировать
+стоит неизменяемые данные (например, значения полей), а не объекты
+моделей.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+MAX_SIZE = 1000
+TIMEOUT = 30
+CHECK_INTERVAL = 1
+
+
+class LocalCache:
+    def __init__(self, name, max_size=MAX_SIZE, timeout=TIMEOUT,
+                 check_interval=CHECK_INTERVAL):
+        self.name = name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = None
+        # Считаются в памяти: метрики в общем кеше съели бы выигрыш.
+        self.hits = self.misses = 0
+
+    @property
+    def version_key(self):
+        return f'local_cache:{self.name}:version'
+
+    def _check_version(self, now):
+        if (self._checked_at is not None
+                and now - self._checked_at < self.check_interval):
+            return
+        version = cache.get(self.version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.add(self.version_key, version, None)
+            version = cache.get(self.version_key, version)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._checked_at = now
+
+    def get_or_load(self, key, load):
+        """Значение из памяти процесса или load(), если его там нет.
+
+        Возвращается сам закешированный объект, менять его нельзя.
+        Исключения load() (например, Http404) не кешируются.
+        """
+        now = time.monotonic()
+        self._check_version(now)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        self.misses += 1
+        version = self._version
+        value = load()
+        with self._lock:
+            # Пока шла загрузка, кеш мог быть сброшен.
+            if version == self._version:
+                self._entries[key] = (value, now + self.timeout)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        """Сбрасывает кеш в этом процессе и во всех остальных."""
+        version = uuid.uuid4().hex
+        cache.set(self.version_key, version, None)
+        with self._lock:
+            self._entries.clear()
+            self._version = version
+            self._checked_at = time.monotonic()
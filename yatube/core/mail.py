@@ -0,0 +1,197 @@
+import base64
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutgoingMail
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_SEPARATOR = '\n'
+
+DEFAULTS = {
+    'BACKEND': 'django.core.mail.backends.filebased.EmailBackend',
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 60,
+    'LEASE': 300,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'MAIL_QUEUE', {}).get(name, DEFAULTS[name])
+
+
+def _join(addresses):
+    return ADDRESS_SEPARATOR.join(addresses)
+
+
+def _split(addresses):
+    return [address for address in addresses.split(ADDRESS_SEPARATOR)
+            if address]
+
+
+def _dump_part(content, mimetype, filename=None, alternative=False):
+    part = {'mimetype': mimetype}
+    if filename:
+        part['filename'] = filename
+    if alternative:
+        part['alternative'] = True
+    if isinstance(content, bytes):
+        part['content'] = base64.b64encode(content).decode('ascii')
+        part['base64'] = True
+    else:
+        part['content'] = content
+    return part
+
+
+def _load_content(part):
+    if part.get('base64'):
+        return base64.b64decode(part['content'])
+    return part['content']
+
+
+def dump_attachments(message):
+    """HTML-версия письма и список остальных вложений и альтернативных
+    версий для JSON.
+
+    Вместо списка возвращается None, если среди вложений есть готовые
+    MIME-части: их не сохранить без потерь, и такое письмо отправляется
+    сразу.
+    """
+    parts = []
+    html_body = ''
+    for content, mimetype in getattr(message, 'alternatives', ()):
+        if mimetype == 'text/html' and not html_body:
+            html_body = content
+        else:
+            parts.append(_dump_part(content, mimetype, alternative=True))
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            return None, None
+        filename, content, mimetype = attachment
+        parts.append(_dump_part(content, mimetype, filename))
+    return html_body, parts
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Записывает письма в таблицу OutgoingMail вместо отправки.
+
+    Доставкой занимается команда send_queued_mail.
+    """
+
+    def send_messages(self, email_messages):
+        mails = []
+        direct = []
+        for message in email_messages:
+            html_body, parts = dump_attachments(message)
+            if parts is None:
+                direct.append(message)
+                continue
+            mails.append(OutgoingMail(
+                subject=message.subject,
+                body=message.body,
+                html_body=html_body,
+                from_email=message.from_email,
+                to=_join(message.to),
+                cc=_join(message.cc),
+                bcc=_join(message.bcc),
+                reply_to=_join(message.reply_to),
+                headers=json.dumps(message.extra_headers)
+                if message.extra_headers else '',
+                attachments=json.dumps(parts) if parts else '',
+            ))
+        OutgoingMail.objects.bulk_create(mails)
+        sent = len(mails)
+        if direct:
+            with get_connection(get_setting('BACKEND')) as connection:
+                sent += connection.send_messages(direct) or 0
+        return sent
+
+
+def build_message(mail, connection=None):
+    message = EmailMultiAlternatives(
+        subject=mail.subject,
+        body=mail.body,
+        from_email=mail.from_email,
+        to=_split(mail.to),
+        cc=_split(mail.cc),
+        bcc=_split(mail.bcc),
+        reply_to=_split(mail.reply_to),
+        headers=json.loads(mail.headers) if mail.headers else None,
+        connection=connection,
+    )
+    if mail.html_body:
+        message.attach_alternative(mail.html_body, 'text/html')
+    for part in json.loads(mail.attachments) if mail.attachments else ():
+        if part.get('alternative'):
+            message.attach_alternative(
+                _load_content(part), part['mimetype'])
+        else:
+            message.attach(
+                part.get('filename'), _load_content(part), part['mimetype'])
+    return message
+
+
+def claim_batch(batch_size):
+    """Выбирает письма, которые пора отправлять, и продлевает им срок
+    следующей попытки, чтобы параллельный обработчик их не взял."""
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=get_setting('LEASE'))
+    due = OutgoingMail.objects.filter(
+        status=OutgoingMail.QUEUED,
+        next_attempt_at__lte=now,
+    )[:batch_size]
+    claimed = []
+    for mail in due:
+        if OutgoingMail.objects.filter(
+                pk=mail.pk,
+                next_attempt_at=mail.next_attempt_at).update(
+                    next_attempt_at=lease_until):
+            claimed.append(mail)
+    return claimed
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=get_setting('RETRY_DELAY') * 2 ** (attempts - 1))
+
+
+def deliver(mail, connection):
+    try:
+        build_message(mail, connection).send()
+    except Exception as error:
+        logger.warning('Не удалось отправить письмо %s: %s', mail.pk, error)
+        attempts = mail.attempts + 1
+        failed = attempts >= get_setting('MAX_ATTEMPTS')
+        OutgoingMail.objects.filter(pk=mail.pk).update(
+            attempts=F('attempts') + 1,
+            status=OutgoingMail.FAILED if failed else OutgoingMail.QUEUED,
+            next_attempt_at=timezone.now() + retry_delay(attempts),
+            last_error=str(error),
+        )
+        return False
+    OutgoingMail.objects.filter(pk=mail.pk).update(
+        attempts=F('attempts') + 1,
+        status=OutgoingMail.SENT,
+        sent_at=timezone.now(),
+        last_error='',
+    )
+    return True
+
+
+def send_queued(batch_size=None):
+    """Отправляет одну пачку писем. Возвращает пару (отправлено, ошибок)."""
+    batch = claim_batch(batch_size or get_setting('BATCH_SIZE'))
+    if not batch:
+        return 0, 0
+    sent = 0
+    with get_connection(get_setting('BACKEND')) as connection:
+        for mail in batch:
+            sent += deliver(mail, connection)
+    return sent, len(batch) - sent
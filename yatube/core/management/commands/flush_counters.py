@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.counters import FLUSH_BATCH_SIZE, flush_all
+
+
+class Command(BaseCommand):
+    help = ('Записывает в базу накопленные в кеше счётчики '
+            '(отметки «Нравится» и т.п.).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=FLUSH_BATCH_SIZE,
+            help='Сколько объектов обновлять одним запросом.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать непрерывно.')
+        parser.add_argument(
+            '--interval', type=float, default=10,
+            help='Пауза между проходами в режиме --loop, секунды.')
+
+    def handle(self, *args, **options):
+        while True:
+            for name, deltas in flush_all(options['batch_size']).items():
+                if deltas:
+                    self.stdout.write(
+                        f'{name}: обновлено объектов {len(deltas)}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
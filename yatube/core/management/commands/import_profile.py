@@ -0,0 +1,74 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Что выполняется в отдельном процессе при каждом варианте запуска.
+TARGETS = {
+    'setup': 'import django; django.setup()',
+    'wsgi': 'import {wsgi_module}',
+}
+IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+LIMIT = 25
+
+
+def profile_imports(target):
+    """Запускает target в новом процессе с -X importtime и возвращает
+    список (модуль, собственное время в мкс, время с подмодулями в мкс,
+    глубина вложенности)."""
+    wsgi_module = settings.WSGI_APPLICATION.rsplit('.', 1)[0]
+    code = TARGETS[target].format(wsgi_module=wsgi_module)
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append(
+                (name, int(own), int(cumulative), len(indent) // 2))
+    return modules
+
+
+class Command(BaseCommand):
+    help = ('Показывает, сколько времени занимает импорт модулей '
+            'при запуске manage.py или WSGI-процесса.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', choices=sorted(TARGETS), default='wsgi',
+            help='setup — django.setup() как в manage.py, '
+                 'wsgi — загрузка WSGI_APPLICATION.')
+        parser.add_argument(
+            '--limit', type=int, default=LIMIT,
+            help='Сколько самых долгих модулей и пакетов показать.')
+
+    def handle(self, *args, **options):
+        modules = profile_imports(options['target'])
+        limit = options['limit']
+        packages = defaultdict(int)
+        for name, own, _, _ in modules:
+            packages[name.split('.')[0]] += own
+        total = sum(packages.values())
+        self.stdout.write(
+            f'Импортировано модулей: {len(modules)}, '
+            f'всего {total / 1000:.1f} мс')
+        self.stdout.write('\nПакеты (собственное время модулей):')
+        for package, own in sorted(
+                packages.items(), key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f'{own / 1000:10.1f} мс  {package}')
+        self.stdout.write('\nМодули (время вместе с подмодулями):')
+        for name, own, cumulative, depth in sorted(
+                modules, key=lambda module: -module[2])[:limit]:
+            self.stdout.write(
+                f'{cumulative / 1000:10.1f} мс {own / 1000:8.1f} мс  '
+                f'{"  " * depth}{name}')
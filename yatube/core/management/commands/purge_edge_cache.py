@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.edge_cache import BATCH_SIZE, process_pending
+
+
+class Command(BaseCommand):
+    help = ('Отправляет кеширующему прокси запросы PURGE для ключей '
+            'из очереди EdgePurge.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько ключей очереди отправлять одним запросом.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать непрерывно, опрашивая очередь.')
+        parser.add_argument(
+            '--interval', type=float, default=1,
+            help='Пауза между проходами в режиме --loop, секунды.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            processed = batch = process_pending(batch_size)
+            while batch == batch_size:
+                batch = process_pending(batch_size)
+                processed += batch
+            if processed:
+                self.stdout.write(f'Отправлено ключей: {processed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import get_setting, send_queued
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди OutgoingMail пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Сколько писем отправлять за один проход.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать непрерывно, опрашивая очередь.')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проходами в режиме --loop, секунды.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or get_setting('BATCH_SIZE')
+        while True:
+            sent, failed = send_queued(batch_size)
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено: {sent}, ошибок: {failed}')
+            if sent + failed < batch_size:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
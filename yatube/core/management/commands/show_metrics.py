@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core import metrics
+
+HIT_SUFFIX = '.hit'
+MISS_SUFFIX = '.miss'
+
+
+class Command(BaseCommand):
+    help = 'Показывает счётчики метрик и долю попаданий в кеши.'
+
+    def handle(self, *args, **options):
+        values = metrics.get_all()
+        for name in sorted(values):
+            self.stdout.write(f'{name}: {values[name]}')
+        for name in sorted(values):
+            if not name.endswith(HIT_SUFFIX):
+                continue
+            prefix = name[:-len(HIT_SUFFIX)]
+            hits = values[name]
+            total = hits + values.get(prefix + MISS_SUFFIX, 0)
+            if not total:
+                continue
+            self.stdout.write(
+                f'{prefix} hit rate: {hits / total:.1%} ({hits}/{total})')
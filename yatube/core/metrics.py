@@ -0,0 +1,53 @@
+"""Счётчики метрик в общем кеше.
+
+Отчёт строится по заранее известному списку имён, а не по индексу в
+кеше: индекс пришлось бы обновлять неатомарно, и потерянное имя (или
+вытесненный индекс) пропадало бы из отчёта навсегда.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+METRICS_PREFIX = 'metrics'
+
+KNOWN_METRICS = (
+    'page_cache.hit',
+    'page_cache.miss',
+    'compression.cache.hit',
+    'compression.cache.miss',
+    'edge_cache.purge',
+    'edge_cache.purge.error',
+    'throttle.hit',
+)
+
+
+def _key(name):
+    return f'{METRICS_PREFIX}:{name}'
+
+
+def known_names():
+    """Имена всех метрик сайта, включая счётчики ограничений по
+    представлениям из THROTTLE_RATES."""
+    throttled = getattr(settings, 'THROTTLE_RATES', {})
+    return list(KNOWN_METRICS) + [
+        f'throttle.hit.{view_name}' for view_name in throttled]
+
+
+def incr(name, value=1):
+    """Увеличивает счётчик метрики в общем кеше."""
+    key = _key(name)
+    if cache.add(key, value, None):
+        return
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        cache.set(key, value, None)
+
+
+def get(name):
+    return cache.get(_key(name), 0)
+
+
+def get_all(names=None):
+    names = known_names() if names is None else names
+    values = cache.get_many([_key(name) for name in names])
+    return {name: values.get(_key(name), 0) for name in names}
@@ -0,0 +1,317 @@
+import hashlib
+import math
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.dispatch import Signal
+from django.http import FileResponse, HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+
+from . import auth, cache_tags, edge_cache, metrics
+from .compression import FILE_EXTENSIONS, accepted_encodings, compress
+from .throttling import SlidingWindow, get_ident, get_rule
+from .views import too_many_requests
+
+
+def get_view_name(request):
+    """Имя URL с пространством имён приложения, например 'posts:index'."""
+    match = request.resolver_match
+    if match is None or match.url_name is None:
+        return None
+    return ':'.join(match.app_names + [match.url_name])
+
+
+def get_cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = auth.get_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware, которая берёт пользователя из кеша
+    вместо запроса к auth_user (см. core.auth.get_user)."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+
+
+class ThrottleMiddleware:
+    """Ограничивает частоту запросов к представлениям из THROTTLE_RATES.
+
+    По умолчанию считаются только POST-запросы: открыть форму входа или
+    регистрации можно всегда. Для ссылок, которые меняют данные по GET
+    (подписка и отписка), методы задаются в правиле явно.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = get_view_name(request)
+        rule = get_rule(view_name)
+        if rule is None:
+            return None
+        rate, methods = rule
+        if request.method not in methods:
+            return None
+        limit = SlidingWindow(f'{view_name}:{get_ident(request)}', rate)
+        retry_after = limit.consume()
+        if not retry_after:
+            return None
+        metrics.incr('throttle.hit')
+        metrics.incr(f'throttle.hit.{view_name}')
+        return too_many_requests(request, math.ceil(retry_after))
+
+
+class StaticFilesMiddleware:
+    """Отдаёт файлы из STATIC_ROOT, выбирая заранее сжатую копию
+    по Accept-Encoding. Файлы с хешем в имени кешируются навсегда."""
+
+    immutable_max_age = 365 * 24 * 60 * 60
+    max_age = 60 * 60
+    re_hashed = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(self.prefix)):
+            response = self.serve(request)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request):
+        name = request.path_info[len(self.prefix):]
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except ValueError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        content_type, _ = mimetypes.guess_type(path)
+        encoding = None
+        for accepted in accepted_encodings(request):
+            if os.path.isfile(path + FILE_EXTENSIONS[accepted]):
+                encoding = accepted
+                path += FILE_EXTENSIONS[accepted]
+                break
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if self.re_hashed.search(name):
+            response['Cache-Control'] = (
+                f'public, max-age={self.immutable_max_age}, immutable')
+        else:
+            response['Cache-Control'] = f'public, max-age={self.max_age}'
+        return response
+
+
+class CompressionMiddleware:
+    """Сжимает ответы и кеширует сжатое тело по хешу несжатого.
+
+    Одна и та же страница, отданная из любого кеша страниц или фрагментов,
+    сжимается только один раз. Кешируются только тела, общие для многих
+    посетителей (см. is_shared); остальные ответы сжимаются без кеша.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_sizes = getattr(settings, 'COMPRESSION_MIN_SIZES', {})
+        self.timeout = getattr(settings, 'COMPRESSION_CACHE_TIMEOUT', 600)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '').split(';')[0]
+        min_size = self.min_sizes.get(content_type)
+        if (min_size is None or response.streaming
+                or response.has_header('Content-Encoding')):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < min_size:
+            return response
+        shared = self.is_shared(request, response)
+        for encoding in accepted_encodings(request):
+            compressed = self.get_compressed(
+                response.content, encoding, shared)
+            if compressed is not None:
+                break
+        else:
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    @staticmethod
+    def is_shared(request, response):
+        """Одинаково ли тело ответа для многих посетителей.
+
+        Страницы залогиненных пользователей и формы с CSRF-токеном
+        уникальны: их сжатые копии только вытесняли бы из кеша сессии,
+        буферы счётчиков и версии тегов.
+        """
+        if response.get('X-Page-Cache') == 'HIT':
+            return True
+        return (request.method == 'GET'
+                and settings.SESSION_COOKIE_NAME not in request.COOKIES
+                and not response.cookies
+                and not request.META.get('CSRF_COOKIE_USED')
+                and 'private' not in response.get('Cache-Control', ''))
+
+    def get_compressed(self, content, encoding, shared=True):
+        if not shared:
+            compressed = compress(content, encoding)
+            return compressed if len(compressed) < len(content) else None
+        digest = hashlib.md5(content).hexdigest()
+        key = f'compressed:{encoding}:{digest}'
+        compressed = cache.get(key)
+        if compressed is not None:
+            metrics.incr('compression.cache.hit')
+            return compressed or None
+        metrics.incr('compression.cache.miss')
+        compressed = compress(content, encoding)
+        if len(compressed) >= len(content):
+            # Запоминаем, что сжимать эту страницу бессмысленно.
+            compressed = b''
+        cache.set(key, compressed, self.timeout)
+        return compressed or None
+
+
+class EdgeCacheMiddleware:
+    """Выставляет Cache-Control по политике представления (CACHE_POLICIES)
+    и Surrogate-Key по тегам ответа для кеширующего прокси.
+
+    Ответы залогиненным пользователям помечаются private, no-store.
+    Стоит после PageCacheMiddleware, чтобы заголовки попадали и в кеш
+    страниц.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Cache-Control'):
+            return response
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            response['Cache-Control'] = edge_cache.PRIVATE_CACHE_CONTROL
+            return response
+        policy = edge_cache.get_policy(get_view_name(request))
+        if policy is None or not self.is_cacheable(request, response):
+            return response
+        response['Cache-Control'] = edge_cache.public_cache_control(policy)
+        patch_vary_headers(response, ('Cookie',))
+        tags = getattr(response, 'cache_tags', None)
+        if tags:
+            response['Surrogate-Key'] = edge_cache.surrogate_keys(tags)
+        return response
+
+    @staticmethod
+    def is_cacheable(request, response):
+        return (request.method in ('GET', 'HEAD')
+                and response.status_code == 200
+                and not response.cookies
+                and not request.META.get('CSRF_COOKIE_USED'))
+
+
+# Отправляется, когда страница отдана из кеша и view не вызывался.
+page_cache_hit = Signal(providing_args=['request'])
+
+
+class PageCacheMiddleware:
+    """Кеширует целые страницы для анонимных посетителей.
+
+    Должен стоять до SessionMiddleware: посетитель без сессионной cookie
+    получает страницу из кеша без загрузки сессии и пользователя.
+    В кеш попадают только ответы, помеченные тегами (tag_response).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (getattr(settings, 'PAGE_CACHE_ENABLED', False)
+                and self.is_cacheable_request(request)):
+            return self.get_response(request)
+        key = self.get_cache_key(request)
+        entry = cache_tags.get_tagged(key)
+        if entry is not None:
+            metrics.incr('page_cache.hit')
+            self.send_hit(request)
+            return self.build_response(entry)
+        metrics.incr('page_cache.miss')
+        response = self.get_response(request)
+        if self.is_cacheable_response(request, response):
+            entry = (
+                response.status_code,
+                list(response.items()),
+                response.content,
+            )
+            cache_tags.set_tagged(
+                key, entry, response.cache_tags,
+                getattr(settings, 'PAGE_CACHE_TIMEOUT', 300))
+        response['X-Page-Cache'] = 'MISS'
+        return response
+
+    @staticmethod
+    def send_hit(request):
+        if not page_cache_hit.has_listeners():
+            return
+        try:
+            request.resolver_match = resolve(request.path_info)
+        except Resolver404:
+            return
+        page_cache_hit.send(sender=None, request=request)
+
+    @staticmethod
+    def is_cacheable_request(request):
+        return (request.method in ('GET', 'HEAD')
+                and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+    @staticmethod
+    def is_cacheable_response(request, response):
+        return (request.method == 'GET'
+                and response.status_code == 200
+                and not response.streaming
+                and getattr(response, 'cache_tags', None)
+                and not response.cookies
+                and not request.META.get('CSRF_COOKIE_USED')
+                and 'private' not in response.get('Cache-Control', ''))
+
+    @staticmethod
+    def get_cache_key(request):
+        path = request.get_full_path().encode()
+        return 'page:' + hashlib.md5(path).hexdigest()
+
+    @staticmethod
+    def build_response(entry):
+        status, headers, content = entry
+        response = HttpResponse(content, status=status)
+        for header, value in headers:
+            response[header] = value
+        response['X-Page-Cache'] = 'HIT'
+        return response
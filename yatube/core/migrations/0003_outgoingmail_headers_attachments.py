@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_storedfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingmail',
+            name='attachments',
+            field=models.TextField(blank=True, help_text='JSON-список вложений и альтернативных версий кроме HTML.', verbose_name='Вложения'),
+        ),
+        migrations.AddField(
+            model_name='outgoingmail',
+            name='headers',
+            field=models.TextField(blank=True, help_text='JSON-объект с заголовками письма.', verbose_name='Дополнительные заголовки'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_outgoingmail_headers_attachments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EdgePurge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=255, verbose_name='Ключ')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Очистка прокси',
+                'verbose_name_plural': 'Очередь очистки прокси',
+                'ordering': ('pk',),
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutgoingMail(models.Model):
+    QUEUED = 'queued'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    subject = models.TextField('Тема')
+    body = models.TextField('Текст')
+    html_body = models.TextField('HTML-версия', blank=True)
+    from_email = models.CharField('Отправитель', max_length=254)
+    to = models.TextField('Получатели', blank=True)
+    cc = models.TextField('Копия', blank=True)
+    bcc = models.TextField('Скрытая копия', blank=True)
+    reply_to = models.TextField('Ответить', blank=True)
+    headers = models.TextField(
+        'Дополнительные заголовки',
+        blank=True,
+        help_text='JSON-объект с заголовками письма.')
+    attachments = models.TextField(
+        'Вложения',
+        blank=True,
+        help_text='JSON-список вложений и альтернативных версий '
+                  'кроме HTML.')
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('next_attempt_at',)
+        indexes = (
+            models.Index(fields=('status', 'next_attempt_at')),
+        )
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.subject} → {self.to}'
+
+
+class StoredFile(models.Model):
+    """Число ссылок на файл в ContentAddressedStorage."""
+
+    name = models.CharField('Имя файла', max_length=255, unique=True)
+    refcount = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return self.name
+
+
+class EdgePurge(models.Model):
+    """Ключ кеширующего прокси, который нужно очистить запросом PURGE."""
+
+    tag = models.CharField('Ключ', max_length=255)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        ordering = ('pk',)
+        verbose_name = 'Очистка прокси'
+        verbose_name_plural = 'Очередь очистки прокси'
+
+    def __str__(self):
+        return self.tag
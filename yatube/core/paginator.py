@@ -0,0 +1,138 @@
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from . import cache_tags
+
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimate_count(model, using='default'):
+    """Быстрая оценка числа строк в таблице без полного прохода по ней."""
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class '
+                       'WHERE relname = %s'),
+        # Заполняется командой ANALYZE.
+        'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+    }
+    if connection.vendor in queries:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(queries[connection.vendor], [table])
+                row = cursor.fetchone()
+        except DatabaseError:
+            row = None
+        if row and row[0] is not None:
+            return int(str(row[0]).split()[0])
+    # Для таблиц с автоинкрементным ключом и редкими удалениями
+    # максимальный первичный ключ близок к числу строк.
+    return model._base_manager.using(using).aggregate(
+        max_pk=Max('pk'))['max_pk'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Для нефильтрованных больших таблиц использует оценку числа строк
+    вместо COUNT(*).
+
+    По умолчанию оценка применяется к запросам без условий; estimate=True
+    разрешает её и для базового запроса с постоянными условиями. Для
+    запросов с условиями, которые не используют индекс (поиск по
+    подстроке), count_limit ограничивает подсчёт: строки считаются не
+    дальше этого числа, и база прекращает просмотр таблицы.
+    """
+
+    def __init__(self, *args, estimate=None, count_limit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimate = estimate
+        self.count_limit = count_limit
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        estimate = self.estimate
+        if estimate is None:
+            estimate = query is not None and not query.where
+        if query is not None and not estimate and self.count_limit:
+            return self.object_list[:self.count_limit].count()
+        if query is None or not estimate:
+            return super().count
+        estimate = estimate_count(self.object_list.model,
+                                  self.object_list.db)
+        if estimate < ESTIMATE_THRESHOLD:
+            return super().count
+        return estimate
+
+
+def get_elided_page_range(paginator, number, on_each_side=2, on_ends=1):
+    """Номера страниц вокруг текущей и по краям; None обозначает пропуск."""
+    number = paginator.validate_number(number)
+    num_pages = paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2:
+        yield from paginator.page_range
+        return
+    if number > on_each_side + on_ends + 2:
+        yield from range(1, on_ends + 1)
+        yield None
+        yield from range(number - on_each_side, number + 1)
+    else:
+        yield from range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        yield from range(number + 1, number + on_each_side + 1)
+        yield None
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(number + 1, num_pages + 1)
+
+
+class CachedCountPaginator(Paginator):
+    """Берёт число объектов из кеша, сбрасываемого по тегам.
+
+    Без cache_key ведёт себя как обычный пагинатор.
+    """
+
+    def __init__(self, *args, cache_key=None, tags=(), timeout=None,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_key = cache_key
+        self.tags = tags
+        self.timeout = timeout
+
+    @cached_property
+    def count(self):
+        if self.cache_key is None:
+            return super().count
+        key = f'count:{self.cache_key}'
+        count = cache_tags.get_tagged(key)
+        if count is None:
+            count = super().count
+            cache_tags.set_tagged(key, count, self.tags, self.timeout)
+        return count
+
+
+class KnownCountPaginator(Paginator):
+    """Пагинатор с заранее известным числом объектов, например
+    из денормализованного счётчика: COUNT(*) не выполняется."""
+
+    def __init__(self, *args, count, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count = count
+
+
+def encode_cursor(moment, pk):
+    """Позиция в ленте с сортировкой по (дата, pk) для keyset-пагинации."""
+    return f'{moment.isoformat()}_{pk}'
+
+
+def decode_cursor(value):
+    try:
+        moment, pk = value.rsplit('_', 1)
+        moment, pk = parse_datetime(moment), int(pk)
+    except (AttributeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return moment, pk
@@ -0,0 +1,173 @@
+"""Профилировщик отрисовки шаблонов.
+
+Замеряет полное и собственное время каждого шаблона (включая include),
+а также тегов и фильтров из подключаемых библиотек ({% load %}).
+Для выбранных запросов пишет файл в формате «folded stacks», который
+понимают flamegraph.pl и speedscope.
+"""
+import functools
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template import engines
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'OUTPUT_DIR': 'profiles',
+}
+
+_local = threading.local()
+_originals = {}
+re_unsafe = re.compile(r'[;\s]+')
+
+
+def get_setting(name):
+    return getattr(settings, 'TEMPLATE_PROFILER', {}).get(
+        name, DEFAULTS[name])
+
+
+class Profile:
+    def __init__(self):
+        self.stack = []
+        self.folded = defaultdict(float)
+        # имя -> [вызовы, полное время, собственное время]
+        self.stats = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def enter(self, name):
+        self.stack.append([re_unsafe.sub('_', name), time.perf_counter(), 0])
+
+    def exit(self):
+        name, start, children = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        if self.stack:
+            self.stack[-1][2] += elapsed
+        path = ';'.join([frame[0] for frame in self.stack] + [name])
+        self.folded[path] += elapsed - children
+        stat = self.stats[name]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] += elapsed - children
+
+    def write_folded(self, path):
+        with open(path, 'w') as output:
+            for stack, seconds in sorted(self.folded.items()):
+                output.write(f'{stack} {round(seconds * 1e6)}\n')
+
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+
+def _call(name, func, *args, **kwargs):
+    profile = current_profile()
+    if profile is None:
+        return func(*args, **kwargs)
+    profile.enter(name)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.exit()
+
+
+def _wrap_render(render):
+    @functools.wraps(render)
+    def wrapper(self, context):
+        return _call(f'template:{self.name or "<string>"}',
+                     render, self, context)
+    wrapper._profiled = True
+    return wrapper
+
+
+def _wrap_filter(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return _call(f'filter:{name}', func, *args, **kwargs)
+    return wrapper
+
+
+def _wrap_tag(name, compile_func):
+    @functools.wraps(compile_func)
+    def wrapper(parser, token):
+        node = compile_func(parser, token)
+        render = node.render
+        node.render = functools.partial(_call, f'tag:{name}', render)
+        return node
+    return wrapper
+
+
+def _libraries():
+    # Одна библиотека может быть доступна под несколькими именами.
+    return set(engines['django'].engine.template_libraries.values())
+
+
+def _reset_loaders():
+    for loader in engines['django'].engine.template_loaders:
+        if hasattr(loader, 'reset'):
+            loader.reset()
+
+
+def install():
+    """Оборачивает отрисовку шаблонов и подключаемые библиотеки."""
+    if getattr(Template._render, '_profiled', False):
+        return
+    _originals['render'] = Template._render
+    Template._render = _wrap_render(Template._render)
+    for library in _libraries():
+        _originals[library] = (dict(library.filters), dict(library.tags))
+        for name, func in library.filters.items():
+            library.filters[name] = _wrap_filter(name, func)
+        for name, func in library.tags.items():
+            library.tags[name] = _wrap_tag(name, func)
+    _reset_loaders()
+
+
+def uninstall():
+    if not getattr(Template._render, '_profiled', False):
+        return
+    Template._render = _originals.pop('render')
+    for library in _libraries():
+        filters, tags = _originals.pop(library)
+        library.filters.update(filters)
+        library.tags.update(tags)
+    _reset_loaders()
+
+
+class TemplateProfilerMiddleware:
+    def __init__(self, get_response):
+        if not get_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= get_setting('SAMPLE_RATE'):
+            return self.get_response(request)
+        profile = _local.profile = Profile()
+        profile.enter(f'request:{request.path}')
+        try:
+            return self.get_response(request)
+        finally:
+            profile.exit()
+            _local.profile = None
+            self.save(request, profile)
+
+    def save(self, request, profile):
+        output_dir = get_setting('OUTPUT_DIR')
+        os.makedirs(output_dir, exist_ok=True)
+        slug = re.sub(r'[^\w-]+', '_', request.path).strip('_') or 'index'
+        name = f'{time.time():.6f}-{os.getpid()}-{slug}.folded'
+        profile.write_folded(os.path.join(output_dir, name))
+        for name, (calls, total, own) in sorted(
+                profile.stats.items(), key=lambda item: -item[1][1]):
+            logger.debug('%s: %d calls, %.2f ms total, %.2f ms self',
+                         name, calls, total * 1000, own * 1000)
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import posixpath
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .compression import COMPRESSORS, FILE_EXTENSIONS
+from .models import StoredFile
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.txt', '.html', '.xml', '.json', '.map', '.ico',
+)
+MIN_COMPRESS_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хеширует имена статических файлов и рядом кладёт их сжатые копии
+    (.gz и, если установлен brotli, .br)."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                processed_names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(processed_names):
+            for encoding_name in self.compress(name):
+                yield name, encoding_name, True
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for encoding, compressor in COMPRESSORS.items():
+            compressed = compressor(data)
+            if len(compressed) >= len(data):
+                continue
+            compressed_path = path + FILE_EXTENSIONS[encoding]
+            with open(compressed_path + '.tmp', 'wb') as target:
+                target.write(compressed)
+            os.replace(compressed_path + '.tmp', compressed_path)
+            yield name + FILE_EXTENSIONS[encoding]
+
+
+def file_digest(content):
+    """SHA-256 содержимого файла, прочитанного порциями."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под именем из хеша содержимого.
+
+    Повторная загрузка того же файла не пишет его заново, а возвращает
+    имя уже сохранённого, поэтому и миниатюры sorl у копий общие.
+    Число ссылок на файл хранится в модели StoredFile; его меняют
+    retain() и release() после сохранения ссылающихся объектов, а не
+    save(): файл, загруженный для несохранившегося объекта, остаётся без
+    ссылок, и его удалит cleanup_media.
+    """
+
+    def hashed_name(self, name, digest):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, file_digest(content))
+        if self.exists(name):
+            # Свежее время изменения защищает файл от cleanup_media,
+            # пока новая ссылка на него ещё не записана в базу.
+            os.utime(self.path(name))
+        else:
+            try:
+                name = self._save(name, content)
+            except FileExistsError:
+                # Тот же файл одновременно сохранил другой процесс.
+                pass
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым: занятое имя — это тот же файл.
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+    def retain(self, name):
+        updated = StoredFile.objects.filter(name=name).update(
+            refcount=F('refcount') + 1)
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, refcount=1)
+        except IntegrityError:
+            StoredFile.objects.filter(name=name).update(
+                refcount=F('refcount') + 1)
+
+    def release(self, name):
+        """Уменьшает число ссылок и возвращает оставшееся; None — файл
+        не учитывается (например, загружен до хранения по хешам)."""
+        StoredFile.objects.filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1)
+        return StoredFile.objects.filter(name=name).values_list(
+            'refcount', flat=True).first()
+
+    def references(self, name):
+        return StoredFile.objects.filter(name=name).values_list(
+            'refcount', flat=True).first() or 0
@@ -1,5 +1,7 @@
 from django import template
 
+from core.paginator import get_elided_page_range
+
 
 register = template.Library()
 
@@ -7,3 +9,8 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def elided_page_range(page):
+    return get_elided_page_range(page.paginator, page.number)
@@ -1,7 +1,46 @@
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+from email.mime.text import MIMEText
 from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connection
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+from posts.deletion import schedule_user_deletion
+from posts.models import Group, Post
+
+from . import checks, edge_cache, metrics, profiling
+from .auth import SESSION_HASH, user_cache_key
+from .compression import COMPRESSORS, accepted_encodings
+from .management.commands.import_profile import profile_imports
+from .counters import BufferedCounter
+from .local_cache import LocalCache
+from .paginator import get_elided_page_range
+from .throttling import SlidingWindow
+from .warmup import warm_up
+from .models import EdgePurge, OutgoingMail
+
+User = get_user_model()
 
 
 class PostsUrlsTest(TestCase):
@@ -11,3 +50,788 @@ class PostsUrlsTest(TestCase):
         response = self.client.get(url)
         self.assertTemplateUsed(response, 'core/404.html')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+@override_settings(THROTTLE_RATES={'posts:add_comment': '2/m'})
+class ThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Тест')
+        self.client.force_login(self.user)
+        self.url = reverse('posts:add_comment', args=[self.post.pk])
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_throttled_request_gets_429(self):
+        """Запрос сверх лимита получает 429 с заголовком Retry-After."""
+        for _ in range(2):
+            response = self.client.post(self.url, {'text': 'Комментарий'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.client.post(self.url, {'text': 'Комментарий'})
+        self.assertEqual(
+            response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(self.post.comments.count(), 2)
+        self.assertEqual(metrics.get('throttle.hit.posts:add_comment'), 1)
+
+    def test_limits_are_per_user(self):
+        """Лимит считается отдельно для каждого пользователя."""
+        for _ in range(2):
+            self.client.post(self.url, {'text': 'Комментарий'})
+        self.client.force_login(
+            User.objects.create_user(username='another'))
+        response = self.client.post(self.url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    @override_settings(THROTTLE_RATES={'users:login': '1/m'})
+    def test_only_post_requests_are_throttled(self):
+        """Открытие формы входа не расходует лимит."""
+        self.client.logout()
+        for _ in range(3):
+            response = self.client.get(reverse('users:login'))
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.client.post(reverse('users:login'), {'username': 'auth'})
+        response = self.client.post(
+            reverse('users:login'), {'username': 'auth'})
+        self.assertEqual(
+            response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLE_RATES={
+        'posts:profile_follow': {'rate': '2/m', 'methods': ('GET', 'POST')},
+        'posts:profile_unfollow': {'rate': '2/m', 'methods': ('GET', 'POST')},
+    })
+    def test_follow_toggles_are_throttled(self):
+        """Подписка и отписка по GET-ссылкам тоже ограничены."""
+        author = User.objects.create_user(username='author')
+        follow = reverse('posts:profile_follow', args=('author',))
+        unfollow = reverse('posts:profile_unfollow', args=('author',))
+        for _ in range(2):
+            self.assertEqual(
+                self.client.get(follow).status_code, HTTPStatus.FOUND)
+            self.assertEqual(
+                self.client.get(unfollow).status_code, HTTPStatus.FOUND)
+        response = self.client.get(follow)
+        self.assertEqual(
+            response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertFalse(author.following.exists())
+
+    def test_concurrent_requests_share_limit(self):
+        """Одновременные запросы не превышают лимит."""
+        allowed = []
+
+        def consume():
+            if not SlidingWindow('test', '5/m').consume(now=30):
+                allowed.append(True)
+
+        threads = [threading.Thread(target=consume) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(allowed), 5)
+
+    def test_previous_window_counts_partially(self):
+        """Запросы прошлого окна учитываются по доле, ещё не выпавшей
+        из скользящего окна."""
+        limit = SlidingWindow('test', '4/m')
+        for _ in range(4):
+            self.assertEqual(limit.consume(now=50), 0)
+        self.assertEqual(limit.consume(now=75), 0)
+        self.assertGreater(limit.consume(now=75), 0)
+        self.assertEqual(limit.consume(now=110), 0)
+
+    def test_not_configured_views_are_not_throttled(self):
+        """Представления без настроенного лимита не ограничиваются."""
+        for _ in range(5):
+            response = self.client.get(reverse('posts:index'))
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    MAIL_QUEUE={
+        'BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+        'MAX_ATTEMPTS': 2,
+    })
+class MailQueueTest(TestCase):
+    def test_mail_is_queued_not_sent(self):
+        """Письмо сохраняется в очередь и не отправляется сразу."""
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutgoingMail.objects.get()
+        self.assertEqual(queued.status, OutgoingMail.QUEUED)
+        self.assertEqual(queued.to, 'to@yatube.ru')
+
+    def test_password_reset_is_queued(self):
+        """Письмо для сброса пароля попадает в очередь."""
+        User.objects.create_user(
+            username='auth', email='auth@yatube.ru', password='pass')
+        self.client.post(
+            reverse('users:password_reset'), {'email': 'auth@yatube.ru'})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingMail.objects.count(), 1)
+
+    def test_worker_delivers_queued_mail(self):
+        """Команда send_queued_mail отправляет письма из очереди."""
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        call_command('send_queued_mail')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['to@yatube.ru'])
+        sent = OutgoingMail.objects.get()
+        self.assertEqual(sent.status, OutgoingMail.SENT)
+        self.assertIsNotNone(sent.sent_at)
+        call_command('send_queued_mail')
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_headers_and_attachments_are_delivered(self):
+        """Дополнительные заголовки и вложения доходят до получателя."""
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'],
+            headers={'List-Unsubscribe': '<mailto:stop@yatube.ru>'})
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach_alternative('BEGIN:VCALENDAR', 'text/calendar')
+        message.attach('report.txt', 'Отчёт', 'text/plain')
+        message.attach('logo.gif', b'GIF89a\x00\xff', 'image/gif')
+        message.send()
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('send_queued_mail')
+        sent = mail.outbox[0]
+        self.assertEqual(
+            sent.extra_headers,
+            {'List-Unsubscribe': '<mailto:stop@yatube.ru>'})
+        self.assertEqual(sent.alternatives, [
+            ('<p>Текст</p>', 'text/html'),
+            ('BEGIN:VCALENDAR', 'text/calendar')])
+        self.assertEqual(sent.attachments, [
+            ('report.txt', 'Отчёт', 'text/plain'),
+            ('logo.gif', b'GIF89a\x00\xff', 'image/gif')])
+
+    def test_mime_attachments_are_sent_directly(self):
+        """Письмо с готовой MIME-частью отправляется сразу."""
+        message = mail.EmailMessage(
+            'Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        message.attach(MIMEText('Часть'))
+        message.send()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(OutgoingMail.objects.exists())
+
+    @override_settings(MAIL_QUEUE={
+        'BACKEND': 'core.tests.BrokenEmailBackend',
+        'MAX_ATTEMPTS': 2,
+    })
+    def test_failed_delivery_is_retried_with_backoff(self):
+        """Неудачная отправка откладывается, а после лимита попыток
+        письмо помечается ошибочным."""
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        call_command('send_queued_mail')
+        queued = OutgoingMail.objects.get()
+        self.assertEqual(queued.status, OutgoingMail.QUEUED)
+        self.assertEqual(queued.attempts, 1)
+        self.assertGreater(queued.next_attempt_at, timezone.now())
+        OutgoingMail.objects.update(next_attempt_at=timezone.now())
+        call_command('send_queued_mail')
+        failed = OutgoingMail.objects.get()
+        self.assertEqual(failed.status, OutgoingMail.FAILED)
+        self.assertEqual(failed.last_error, 'SMTP недоступен')
+
+
+class BrokenEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+TEMP_STATIC_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CSS = b'body { margin: 0; padding: 0; }\n' * 50
+
+
+@override_settings(
+    STATICFILES_DIRS=[TEMP_STATIC_DIR],
+    STATIC_ROOT=TEMP_STATIC_ROOT,
+    STATICFILES_STORAGE='core.storage.CompressedManifestStaticFilesStorage')
+class StaticPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.makedirs(os.path.join(TEMP_STATIC_DIR, 'css'))
+        with open(os.path.join(TEMP_STATIC_DIR, 'css', 'site.css'),
+                  'wb') as css:
+            css.write(CSS)
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_DIR, ignore_errors=True)
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.name = staticfiles_storage.stored_name('css/site.css')
+        self.url = settings.STATIC_URL + self.name
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """collectstatic хеширует имена и создаёт сжатые копии."""
+        self.assertNotEqual(self.name, 'css/site.css')
+        path = staticfiles_storage.path(self.name)
+        with gzip.open(path + '.gz') as packed:
+            self.assertEqual(packed.read(), CSS)
+
+    def test_compressed_file_served_when_accepted(self):
+        """Сжатая копия отдаётся клиенту, который её принимает."""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_plain_file_served_without_accept_encoding(self):
+        """Без Accept-Encoding отдаётся несжатый файл."""
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+
+    def test_unhashed_name_is_not_immutable(self):
+        """Файл без хеша в имени кешируется ненадолго."""
+        response = self.client.get(
+            settings.STATIC_URL + 'css/site.css')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+
+@override_settings(COMPRESSION_MIN_SIZES={'text/html': 200})
+class CompressionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('about:author')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_html_is_compressed_when_accepted(self):
+        """HTML сжимается gzip, если клиент его принимает."""
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+    def test_refused_encoding_is_not_used(self):
+        """Кодировка с q=0 не выбирается."""
+        for header in ('gzip;q=0', 'gzip; q=0.0, br;q=0', '*;q=0',
+                       'identity, *;q=0'):
+            with self.subTest(header=header):
+                response = self.client.get(
+                    self.url, HTTP_ACCEPT_ENCODING=header)
+                self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get(
+            self.url, HTTP_ACCEPT_ENCODING='GZIP;q=0.5, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_accept_encoding_qvalues(self):
+        """Кодировки упорядочены по q клиента, затем по нашему выбору."""
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING='br;q=0.5, gzip, deflate')
+        with mock.patch.dict(COMPRESSORS, {'br': bytes}):
+            self.assertEqual(accepted_encodings(request), ['gzip', 'br'])
+            request.META['HTTP_ACCEPT_ENCODING'] = '*'
+            self.assertEqual(accepted_encodings(request), ['br', 'gzip'])
+            request.META['HTTP_ACCEPT_ENCODING'] = 'gzip;q=bad'
+            self.assertEqual(accepted_encodings(request), [])
+
+    def test_compressed_body_is_cached(self):
+        """Одинаковая страница сжимается только один раз."""
+        for _ in range(3):
+            self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(metrics.get('compression.cache.miss'), 1)
+        self.assertEqual(metrics.get('compression.cache.hit'), 2)
+
+    def test_personal_pages_are_not_cached(self):
+        """Страницы залогиненного пользователя сжимаются без кеша."""
+        self.client.force_login(User.objects.create_user(username='auth'))
+        for _ in range(2):
+            response = self.client.get(
+                self.url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(metrics.get('compression.cache.miss'), 0)
+        self.assertEqual(metrics.get('compression.cache.hit'), 0)
+
+    @override_settings(COMPRESSION_MIN_SIZES={'text/html': 10 ** 6})
+    def test_small_responses_are_not_compressed(self):
+        """Ответы меньше порога не сжимаются."""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+TEMP_PROFILES_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(TEMPLATE_PROFILER={
+    'ENABLED': True,
+    'SAMPLE_RATE': 1,
+    'OUTPUT_DIR': TEMP_PROFILES_DIR,
+})
+class TemplateProfilerTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILES_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        profiling.install()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=Group.objects.create(
+                title='Test title', slug='test-slug', description='Test'))
+
+    def tearDown(self):
+        profiling.uninstall()
+        for name in os.listdir(TEMP_PROFILES_DIR):
+            os.remove(os.path.join(TEMP_PROFILES_DIR, name))
+
+    def read_profile(self):
+        names = os.listdir(TEMP_PROFILES_DIR)
+        self.assertEqual(len(names), 1)
+        with open(os.path.join(TEMP_PROFILES_DIR, names[0])) as profile:
+            return dict(line.rsplit(' ', 1) for line in profile)
+
+    def test_folded_stacks_for_templates_and_tags(self):
+        """Профиль содержит вложенные шаблоны и пользовательские теги."""
+        self.client.get(reverse('posts:index'))
+        stacks = self.read_profile()
+        self.assertIn('request:/;template:posts/index.html', stacks)
+        self.assertTrue(any(
+            stack.endswith(
+                'template:includes/post_descript.html;tag:thumbnail')
+            for stack in stacks))
+        self.assertTrue(any(
+            stack.endswith('template:base.html;template:includes/header.html')
+            for stack in stacks))
+        for value in stacks.values():
+            self.assertGreaterEqual(int(value), 0)
+
+    def test_custom_filter_is_profiled(self):
+        """Фильтр addclass попадает в профиль."""
+        self.client.force_login(self.user)
+        self.client.get(reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertTrue(any(
+            stack.endswith('filter:addclass')
+            for stack in self.read_profile()))
+
+    @override_settings(TEMPLATE_PROFILER={
+        'ENABLED': True,
+        'SAMPLE_RATE': 0,
+        'OUTPUT_DIR': TEMP_PROFILES_DIR,
+    })
+    def test_not_sampled_requests_are_not_profiled(self):
+        """Запросы вне выборки не профилируются."""
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(os.listdir(TEMP_PROFILES_DIR), [])
+
+
+class ElidedPaginatorTest(TestCase):
+    def test_page_range_is_elided(self):
+        """Номера страниц сворачиваются в окно вокруг текущей."""
+        paginator = Paginator(range(1000), 10)
+        cases = (
+            (1, [1, 2, 3, None, 100]),
+            (50, [1, None, 48, 49, 50, 51, 52, None, 100]),
+            (100, [1, None, 98, 99, 100]),
+        )
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(get_elided_page_range(paginator, number)),
+                    expected)
+        paginator = Paginator(range(50), 10)
+        self.assertEqual(
+            list(get_elided_page_range(paginator, 1)), [1, 2, 3, 4, 5])
+
+
+class BufferedCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=self.user, text=str(i)) for i in range(3))
+        self.posts = list(Post.objects.order_by('pk'))
+        self.counter = BufferedCounter('test', Post, 'likes_count')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_flush_writes_batched_deltas(self):
+        """Приращения копятся в кеше и записываются одним UPDATE."""
+        first, second, third = self.posts
+        for _ in range(3):
+            self.counter.incr(first.pk)
+        self.counter.incr(second.pk, 2)
+        self.counter.incr(second.pk, -1)
+        self.assertEqual(self.counter.total(first), 3)
+        self.assertEqual(
+            self.counter.get_many([first.pk, third.pk]),
+            {first.pk: 3, third.pk: 0})
+        with self.assertNumQueries(1):
+            deltas = self.counter.flush()
+        self.assertEqual(deltas, {first.pk: 3, second.pk: 1})
+        first.refresh_from_db()
+        self.assertEqual(first.likes_count, 3)
+        self.assertEqual(self.counter.total(first), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counter.flush(), {})
+        self.counter.incr(first.pk)
+        self.assertEqual(self.counter.flush(), {first.pk: 1})
+
+    def test_flush_after_cache_reset(self):
+        """После очистки кеша журнал начинается заново."""
+        self.counter.incr(self.posts[0].pk)
+        self.counter.flush()
+        cache.clear()
+        self.counter.incr(self.posts[1].pk)
+        self.assertEqual(self.counter.flush(), {self.posts[1].pk: 1})
+
+
+class ClampingLocMemCache(LocMemCache):
+    """LocMemCache, которая уменьшает значения как memcached: не ниже
+    нуля, а отрицательное приращение отсутствующего ключа возвращает
+    None без исключения."""
+
+    def incr(self, key, delta=1, version=None):
+        if delta >= 0:
+            return super().incr(key, delta, version)
+        value = self.get(key, version=version)
+        if value is None:
+            return None
+        value = max(value + delta, 0)
+        self.set(key, value, None, version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        if self.get(key, version=version) is None:
+            raise ValueError(f"Key '{key}' not found")
+        return self.incr(key, -delta, version)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'core.tests.ClampingLocMemCache',
+    'LOCATION': 'clamping',
+}})
+class BufferedCounterClampingCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=user, text='Пост')
+        self.counter = BufferedCounter('test', Post, 'likes_count')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_unlike_after_flush_is_not_lost(self):
+        """Уменьшение, пришедшее после сброса раньше увеличений, не
+        теряется в кеше, который не опускает значения ниже нуля."""
+        for _ in range(2):
+            self.counter.incr(self.post.pk)
+        self.counter.flush()
+        self.counter.incr(self.post.pk, -1)
+        self.counter.incr(self.post.pk)
+        self.counter.incr(self.post.pk, -1)
+        self.assertEqual(self.counter.get(self.post.pk), -1)
+        self.assertEqual(self.counter.flush(), {self.post.pk: -1})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.counter.get(self.post.pk), 0)
+
+
+class BufferedCounterErrorsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=user, text='Пост')
+        self.counter = BufferedCounter('test', Post, 'likes_count')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_lost_increment_does_not_go_negative(self):
+        """Уменьшение после потерянного приращения не делает поле
+        отрицательным и не ломает сброс."""
+        self.counter.incr(self.post.pk, -1)
+        self.assertEqual(self.counter.flush(), {self.post.pk: -1})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.counter.incr(self.post.pk)
+        self.counter.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_rejected_delta_is_dropped(self):
+        """Приращение, которое база отвергает, отбрасывается, а остальные
+        записываются."""
+        other = Post.objects.create(author=self.post.author, text='Пост')
+        self.counter.incr(self.post.pk)
+        self.counter.incr(other.pk)
+        update = BufferedCounter._update
+
+        def broken_update(counter, batch):
+            if any(pk == self.post.pk for pk, _ in batch):
+                raise IntegrityError('CHECK constraint failed')
+            update(counter, batch)
+
+        with mock.patch.object(BufferedCounter, '_update', broken_update):
+            with self.assertLogs('core.counters', 'ERROR'):
+                self.counter.flush()
+        other.refresh_from_db()
+        self.assertEqual(other.likes_count, 1)
+        self.assertEqual(self.counter.get(self.post.pk), 0)
+        self.assertEqual(self.counter.flush(), {})
+
+
+class CachedAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='auth', password='old-password-123')
+        self.client.login(username='auth', password='old-password-123')
+        self.url = reverse('posts:follow_index')
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_auth_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        queries = [query['sql'] for query in context.captured_queries
+                   if '"django_session"' in query['sql']
+                   or 'FROM "auth_user"' in query['sql']]
+        return response, queries
+
+    def test_session_and_user_are_cached(self):
+        """Сессия и пользователь берутся из кеша без запросов к базе."""
+        self.client.get(self.url)
+        response, queries = self.get_auth_queries()
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_hash_is_not_cached(self):
+        """В кеше нет хеша пароля, только хеш сессии."""
+        self.client.get(self.url)
+        values = cache.get(user_cache_key(self.user.pk))
+        self.assertNotIn('password', values)
+        self.assertNotIn(self.user.password, values.values())
+        self.assertEqual(
+            values[SESSION_HASH], self.user.get_session_auth_hash())
+
+    def test_user_edit_invalidates_cache(self):
+        """Изменение пользователя сбрасывает его копию в кеше."""
+        self.client.get(self.url)
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        response, queries = self.get_auth_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['user'].first_name, 'Новое имя')
+
+    def test_password_change_logs_out_other_sessions(self):
+        """После смены пароля старая сессия перестаёт действовать."""
+        self.client.get(self.url)
+        other = Client()
+        other.login(username='auth', password='old-password-123')
+        other.post(reverse('users:password_change'), {
+            'old_password': 'old-password-123',
+            'new_password1': 'new-password-456',
+            'new_password2': 'new-password-456',
+        })
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_logout_and_deactivation(self):
+        """Выход и деактивация пользователя не оставляют его в кеше."""
+        self.client.get(self.url)
+        self.client.get(reverse('users:logout'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.client.login(username='auth', password='old-password-123')
+        self.client.get(self.url)
+        schedule_user_deletion([self.user])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class EdgeCacheHeadersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Текст')
+
+    def test_anonymous_feed_is_public(self):
+        """Анонимная лента кешируется прокси и помечена ключами."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertEqual(
+            response['Cache-Control'],
+            'public, max-age=30, stale-while-revalidate=120')
+        keys = response['Surrogate-Key'].split()
+        self.assertIn(f'post:{self.post.pk}', keys)
+        self.assertIn(f'author:{self.user.pk}', keys)
+
+    def test_authenticated_response_is_private(self):
+        """Ответы залогиненным пользователям не кешируются."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        self.assertFalse(response.has_header('Surrogate-Key'))
+
+    def test_view_without_policy(self):
+        """Без политики страница не становится публичной."""
+        response = self.client.get(reverse('users:login'))
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+        self.assertFalse(response.has_header('Surrogate-Key'))
+
+
+class PurgeRecorder(BaseHTTPRequestHandler):
+    """Заглушка кеширующего прокси: запоминает ключи из запросов PURGE."""
+
+    def do_PURGE(self):
+        self.server.purged.append(self.headers['Surrogate-Key'])
+        self.send_response(HTTPStatus.OK)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class EdgeCachePurgeTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.server = HTTPServer(('127.0.0.1', 0), PurgeRecorder)
+        self.server.purged = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        host, port = self.server.server_address
+        self.settings = override_settings(EDGE_CACHE={
+            'PURGE_URL': f'http://{host}:{port}/', 'TIMEOUT': 2})
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        cache.clear()
+
+    def test_post_change_purges_its_keys(self):
+        """Изменение поста очищает в прокси страницы с его ключами."""
+        user = User.objects.create_user(username='auth')
+        post = Post.objects.create(author=user, text='Текст')
+        self.server.purged.clear()
+        post.text = 'Новый текст'
+        post.save()
+        # Запрос не ждёт прокси: ключи только ставятся в очередь.
+        self.assertEqual(self.server.purged, [])
+        self.assertTrue(EdgePurge.objects.exists())
+        call_command('purge_edge_cache', stdout=StringIO())
+        self.assertFalse(EdgePurge.objects.exists())
+        self.assertEqual(len(self.server.purged), 1)
+        keys = self.server.purged[0].split()
+        self.assertIn(f'post:{post.pk}', keys)
+        self.assertIn(f'author:{user.pk}', keys)
+
+    def test_unavailable_proxy_is_ignored(self):
+        """Недоступный прокси не ломает запрос."""
+        with override_settings(EDGE_CACHE={
+                'PURGE_URL': 'http://127.0.0.1:9/', 'TIMEOUT': 0.5}):
+            self.assertFalse(edge_cache.purge({'feed'}))
+            edge_cache.enqueue({'feed'})
+            self.assertEqual(edge_cache.process_pending(), 0)
+        # Неотправленные ключи остаются в очереди до следующего прохода.
+        self.assertEqual(edge_cache.process_pending(), 1)
+        self.assertEqual(self.server.purged, ['feed'])
+
+
+class StartupTest(TestCase):
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        """Pillow и движок миниатюр не загружаются при старте процесса."""
+        names = [module[0] for module in profile_imports('wsgi')]
+        self.assertIn('django', names)
+        self.assertFalse(
+            [name for name in names
+             if name.startswith(('PIL', 'sorl.thumbnail.engines'))])
+
+    def test_import_profile_command(self):
+        """Команда печатает самые долгие импорты."""
+        out = StringIO()
+        call_command('import_profile', target='setup', limit=3, stdout=out)
+        self.assertIn('django', out.getvalue())
+
+    def test_warm_up(self):
+        """Прогрев компилирует шаблоны сайта без ошибок."""
+        self.assertGreater(warm_up(), 0)
+
+
+class SharedCacheCheckTest(TestCase):
+    @override_settings(CACHE_ALLOW_PROCESS_LOCAL=False)
+    def test_process_local_cache_is_refused(self):
+        """Кеш в памяти процесса не проходит проверку без разрешения."""
+        errors = checks.check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        with self.assertRaises(ImproperlyConfigured):
+            checks.require_shared_cache()
+
+    @override_settings(
+        CACHE_ALLOW_PROCESS_LOCAL=False,
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': '127.0.0.1:11211',
+        }})
+    def test_shared_cache_passes(self):
+        """Общий кеш проходит проверку."""
+        self.assertEqual(checks.check_shared_cache(None), [])
+
+
+class LocalCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.loads = []
+        self.local = LocalCache('test', max_size=2, timeout=60)
+
+    def load(self, value):
+        def loader():
+            self.loads.append(value)
+            return value
+        return loader
+
+    def test_hit_returns_cached_value(self):
+        """Повторный поиск не вызывает загрузку и не копирует значение."""
+        first = self.local.get_or_load('a', self.load(('a',)))
+        self.assertIs(self.local.get_or_load('a', self.load(('b',))), first)
+        self.assertEqual(self.loads, [('a',)])
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняется давно не использованная запись."""
+        for key in 'abc':
+            self.local.get_or_load(key, self.load(key))
+        self.local.get_or_load('a', self.load('a2'))
+        self.assertEqual(self.loads, ['a', 'b', 'c', 'a2'])
+
+    def test_invalidate_reaches_other_processes(self):
+        """Смена версии в общем кеше сбрасывает копии других процессов."""
+        other = LocalCache('test', check_interval=0)
+        other.get_or_load('a', self.load('old'))
+        self.local.invalidate()
+        self.assertEqual(other.get_or_load('a', self.load('new')), 'new')
+
+    def test_errors_are_not_cached(self):
+        """Исключения загрузки не кешируются."""
+        def missing():
+            raise LookupError
+        with self.assertRaises(LookupError):
+            self.local.get_or_load('a', missing)
+        self.assertEqual(self.local.get_or_load('a', self.load('a')), 'a')
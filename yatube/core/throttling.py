@@ -0,0 +1,86 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_METHODS = ('POST',)
+
+PERIODS = {
+    's': 1,
+    'm': 60,
+    'h': 60 * 60,
+    'd': 24 * 60 * 60,
+}
+
+
+def parse_rate(rate):
+    """Разбирает строку вида '10/m' в пару (ёмкость, период в секундах)."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class SlidingWindow:
+    """Ограничение частоты по скользящему окну со счётчиками в общем кеше.
+
+    Запросы считаются в окнах длиной в период; текущая частота оценивается
+    как число запросов в текущем окне плюс доля предыдущего, ещё не
+    выпавшая из скользящего окна. Счётчик меняется только атомарными
+    cache.add() и cache.incr()/decr(), поэтому одновременные запросы не
+    могут потратить одно и то же место в лимите.
+    """
+
+    def __init__(self, key, rate):
+        self.key = f'throttle:{key}'
+        self.capacity, self.period = parse_rate(rate)
+
+    def _window_key(self, window):
+        return f'{self.key}:{window}'
+
+    def consume(self, now=None):
+        """Учитывает запрос. Возвращает 0, если лимит не превышен, иначе
+        число секунд, через которое запрос будет разрешён."""
+        now = time.time() if now is None else now
+        window, elapsed = divmod(now, self.period)
+        key = self._window_key(int(window))
+        cache.add(key, 0, self.period * 2)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # Окно вытеснено из кеша между add() и incr().
+            cache.add(key, 1, self.period * 2)
+            count = 1
+        previous = cache.get(self._window_key(int(window) - 1), 0)
+        weight = 1 - elapsed / self.period
+        excess = previous * weight + count - self.capacity
+        if excess <= 0:
+            return 0
+        # Отклонённый запрос не занимает место в лимите.
+        cache.decr(key)
+        remaining = self.period - elapsed
+        if not previous:
+            return remaining
+        return min(remaining, excess * self.period / previous)
+
+
+def get_ident(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded and getattr(settings, 'THROTTLE_TRUST_X_FORWARDED_FOR',
+                             False):
+        return 'ip:' + forwarded.split(',')[0].strip()
+    return 'ip:' + request.META.get('REMOTE_ADDR', '')
+
+
+def get_rule(view_name):
+    """Пара (частота, методы) для представления или None.
+
+    В THROTTLE_RATES частота задаётся строкой (ограничиваются только POST)
+    или словарём {'rate': ..., 'methods': (...)}.
+    """
+    rule = getattr(settings, 'THROTTLE_RATES', {}).get(view_name)
+    if rule is None:
+        return None
+    if isinstance(rule, str):
+        return rule, DEFAULT_METHODS
+    return rule['rate'], tuple(rule.get('methods', DEFAULT_METHODS))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadhandler import FileUploadHandler
+
+UPLOAD_MAX_SIZE = 5 * 1024 * 1024
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Отклоняет запрос, если загружаемые файлы больше UPLOAD_MAX_SIZE.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: тело запроса обрывается
+    до того, как следующие обработчики сохранят лишние байты.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.limit = getattr(settings, 'UPLOAD_MAX_SIZE', UPLOAD_MAX_SIZE)
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.limit:
+            raise RequestDataTooBig(
+                'Загружаемые файлы больше UPLOAD_MAX_SIZE.')
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.limit:
+            raise RequestDataTooBig(
+                'Загружаемые файлы больше UPLOAD_MAX_SIZE.')
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -0,0 +1,79 @@
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+IMAGE_UPLOAD_DEFAULTS = {
+    'FORMATS': ('JPEG', 'PNG', 'GIF', 'WEBP'),
+    'MAX_WIDTH': 8000,
+    'MAX_HEIGHT': 8000,
+    'MAX_PIXELS': 24000000,
+}
+
+
+def get_setting(name):
+    options = getattr(settings, 'IMAGE_UPLOAD', {})
+    return options.get(name, IMAGE_UPLOAD_DEFAULTS[name])
+
+
+def sniff_image_format(header):
+    """Формат картинки по первым байтам файла."""
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def read_image_size(file):
+    """Размеры картинки из заголовка; пиксели при этом не декодируются."""
+    from PIL import Image
+
+    with warnings.catch_warnings():
+        # Размеры проверяются ниже по нашим ограничениям.
+        warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+        try:
+            # Не закрываем картинку: close() закрыл бы и загруженный файл.
+            return Image.open(file).size
+        except Image.DecompressionBombError:
+            return None
+
+
+def validate_image_header(file):
+    """Проверяет формат, размеры и число пикселей картинки по заголовку,
+    не читая файл целиком."""
+    file.seek(0)
+    image_format = sniff_image_format(file.read(16))
+    if image_format not in get_setting('FORMATS'):
+        raise ValidationError(
+            'Неподдерживаемый формат картинки.', code='invalid_image_format')
+    file.seek(0)
+    try:
+        size = read_image_size(file)
+    except Exception:
+        raise ValidationError(
+            'Файл повреждён или не является картинкой.',
+            code='invalid_image')
+    finally:
+        file.seek(0)
+    if size is None:
+        raise ValidationError(
+            'Картинка слишком большая.', code='image_too_large')
+    width, height = size
+    max_width = get_setting('MAX_WIDTH')
+    max_height = get_setting('MAX_HEIGHT')
+    if width > max_width or height > max_height:
+        raise ValidationError(
+            'Картинка больше %(max_width)d×%(max_height)d пикселей.',
+            code='image_too_large',
+            params={'max_width': max_width, 'max_height': max_height})
+    if width * height > get_setting('MAX_PIXELS'):
+        raise ValidationError(
+            'В картинке слишком много пикселей.', code='image_too_large')
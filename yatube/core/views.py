@@ -20,3 +20,11 @@ def forbidden(request, exception=None):
 def server_error(request):
     return render(
         request, 'core/500.html', status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+def too_many_requests(request, retry_after):
+    response = render(
+        request, 'core/429.html',
+        {'retry_after': retry_after}, status=HTTPStatus.TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(retry_after)
+    return response
@@ -0,0 +1,58 @@
+"""Прогрев процесса до приёма запросов: URLconf и шаблоны сайта.
+
+Вызывается из yatube/wsgi.py, если включён WSGI_WARMUP. С кеширующим
+загрузчиком шаблонов (DEBUG = False) скомпилированные шаблоны остаются
+в памяти, и первый запрос к странице не тратит время на разбор.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.xml', '.txt')
+
+
+def iter_template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(TEMPLATE_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_up_urls():
+    """Импортирует все URLconf и строит таблицы для reverse()."""
+    resolver = get_resolver()
+    resolver.reverse_dict
+    return len(resolver.url_patterns)
+
+
+def warm_up_templates():
+    """Компилирует шаблоны из DIRS каждого движка (шаблоны сайта,
+    без шаблонов сторонних приложений вроде админки)."""
+    compiled = 0
+    for engine in engines.all():
+        for directory in getattr(engine, 'dirs', ()):
+            for name in iter_template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError as error:
+                    logger.warning('Шаблон %s не скомпилирован: %s',
+                                   name, error)
+                    continue
+                compiled += 1
+    return compiled
+
+
+def warm_up():
+    started = time.monotonic()
+    patterns = warm_up_urls()
+    templates = warm_up_templates()
+    logger.info(
+        'Прогрев за %.0f мс: URL-шаблонов %d, шаблонов страниц %d',
+        (time.monotonic() - started) * 1000, patterns, templates)
+    return templates
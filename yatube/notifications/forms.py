@@ -0,0 +1,9 @@
+from django import forms
+
+from .models import NotificationSettings
+
+
+class NotificationSettingsForm(forms.ModelForm):
+    class Meta:
+        model = NotificationSettings
+        fields = ('digest',)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.services import FANOUT_CHUNK_SIZE, process_events
+
+
+class Command(BaseCommand):
+    help = 'Раздаёт уведомления о новых постах подписчикам авторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=FANOUT_CHUNK_SIZE,
+            help='Сколько подписчиков обрабатывать в одной транзакции.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать непрерывно, опрашивая очередь событий.')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проходами в режиме --loop, секунды.')
+
+    def handle(self, *args, **options):
+        while True:
+            created = process_events(options['chunk_size'])
+            if created:
+                self.stdout.write(f'Обработано подписок: {created}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from notifications.services import DIGEST_PERIODS, send_digests
+
+
+class Command(BaseCommand):
+    help = 'Отправляет дайджесты непрочитанных уведомлений на почту.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', choices=sorted(DIGEST_PERIODS))
+
+    def handle(self, *args, **options):
+        sent = send_digests(options['period'])
+        self.stdout.write(f'Отправлено дайджестов: {sent}')
@@ -0,0 +1,78 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('posts', '0002_auto_20230319_1614'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('last_follow_id', models.PositiveIntegerField(default=0, verbose_name='Последняя обработанная подписка')),
+                ('processed', models.BooleanField(default=False, verbose_name='Обработано')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='posts.Post', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'Событие публикации',
+                'verbose_name_plural': 'События публикаций',
+                'ordering': ('pk',),
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationSettings',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(choices=[('none', 'Не присылать'), ('hourly', 'Раз в час'), ('daily', 'Раз в день')], default='none', max_length=10, verbose_name='Дайджест на почту')),
+                ('last_digest_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний дайджест')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='notification_settings', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Настройки уведомлений',
+                'verbose_name_plural': 'Настройки уведомлений',
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('is_read', models.BooleanField(default=False, verbose_name='Прочитано')),
+                ('is_digested', models.BooleanField(default=False, verbose_name='Отправлено в дайджесте')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='posts.Post', verbose_name='Публикация')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='Получатель')),
+            ],
+            options={
+                'verbose_name': 'Уведомление',
+                'verbose_name_plural': 'Уведомления',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postevent',
+            index=models.Index(fields=['processed', 'id'], name='notificatio_process_85e82d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationsettings',
+            index=models.Index(fields=['digest', 'last_digest_at'], name='notificatio_digest_01524f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-created'], name='notificatio_recipie_f3da76_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('recipient', 'post'), name='unique_notification'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class PostEvent(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='events',
+        verbose_name='Публикация')
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    last_follow_id = models.PositiveIntegerField(
+        'Последняя обработанная подписка',
+        default=0)
+    processed = models.BooleanField('Обработано', default=False)
+
+    class Meta:
+        ordering = ('pk',)
+        indexes = (
+            models.Index(fields=('processed', 'id')),
+        )
+        verbose_name = 'Событие публикации'
+        verbose_name_plural = 'События публикаций'
+
+    def __str__(self):
+        return f'Событие для поста {self.post_id}'
+
+
+class Notification(models.Model):
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Публикация')
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    is_read = models.BooleanField('Прочитано', default=False)
+    is_digested = models.BooleanField('Отправлено в дайджесте', default=False)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('recipient', 'is_read', '-created')),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipient', 'post'),
+                name='unique_notification'),
+        )
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+
+    def __str__(self):
+        return f'{self.recipient} ← пост {self.post_id}'
+
+
+class NotificationSettings(models.Model):
+    NONE = 'none'
+    HOURLY = 'hourly'
+    DAILY = 'daily'
+    DIGEST_CHOICES = (
+        (NONE, 'Не присылать'),
+        (HOURLY, 'Раз в час'),
+        (DAILY, 'Раз в день'),
+    )
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_settings',
+        verbose_name='Пользователь')
+    digest = models.CharField(
+        'Дайджест на почту',
+        max_length=10,
+        choices=DIGEST_CHOICES,
+        default=NONE)
+    last_digest_at = models.DateTimeField(
+        'Последний дайджест',
+        null=True,
+        blank=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('digest', 'last_digest_at')),
+        )
+        verbose_name = 'Настройки уведомлений'
+        verbose_name_plural = 'Настройки уведомлений'
+
+    def __str__(self):
+        return f'{self.user}: {self.get_digest_display()}'
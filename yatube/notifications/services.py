@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from posts.models import Follow
+
+from .models import Notification, NotificationSettings, PostEvent
+
+FANOUT_CHUNK_SIZE = 500
+DIGEST_LIMIT = 50
+DIGEST_PERIODS = {
+    NotificationSettings.HOURLY: timedelta(hours=1),
+    NotificationSettings.DAILY: timedelta(days=1),
+}
+
+
+def fan_out_chunk(event, chunk_size=FANOUT_CHUNK_SIZE):
+    """Создаёт уведомления для очередной порции подписчиков автора.
+
+    Возвращает число обработанных подписок; после последней порции
+    событие помечается обработанным.
+    """
+    followers = list(
+        Follow.objects
+        .filter(author_id=event.post.author_id, pk__gt=event.last_follow_id)
+        .order_by('pk')
+        .values_list('pk', 'user_id')[:chunk_size])
+    with transaction.atomic():
+        Notification.objects.bulk_create(
+            [Notification(recipient_id=user_id, post_id=event.post_id)
+             for _, user_id in followers],
+            ignore_conflicts=True)
+        if followers:
+            event.last_follow_id = followers[-1][0]
+        event.processed = len(followers) < chunk_size
+        event.save(update_fields=('last_follow_id', 'processed'))
+    return len(followers)
+
+
+def process_events(chunk_size=FANOUT_CHUNK_SIZE, limit=None):
+    """Раздаёт необработанные события подписчикам. Возвращает число
+    созданных (или пропущенных как дубликаты) уведомлений."""
+    events = PostEvent.objects.filter(
+        processed=False).select_related('post')[:limit]
+    total = 0
+    for event in events:
+        while not event.processed:
+            total += fan_out_chunk(event, chunk_size)
+    return total
+
+
+def due_digest_settings(period, now=None):
+    now = now or timezone.now()
+    return NotificationSettings.objects.filter(
+        digest=period,
+    ).exclude(
+        last_digest_at__gt=now - DIGEST_PERIODS[period],
+    ).select_related('user')
+
+
+def send_digest(user_settings, now=None):
+    """Отправляет пользователю дайджест непрочитанных уведомлений."""
+    user = user_settings.user
+    notifications = list(
+        user.notifications
+        .filter(is_read=False, is_digested=False, post__is_deleted=False,
+                post__author__is_active=True)
+        .select_related('post__author')[:DIGEST_LIMIT])
+    user_settings.last_digest_at = now or timezone.now()
+    user_settings.save(update_fields=('last_digest_at',))
+    if not notifications or not user.email:
+        return False
+    body = render_to_string(
+        'notifications/digest.txt',
+        {'user': user, 'notifications': notifications})
+    send_mail(
+        'Новые записи авторов, на которых вы подписаны',
+        body,
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email])
+    Notification.objects.filter(
+        pk__in=[notification.pk for notification in notifications],
+    ).update(is_digested=True)
+    return True
+
+
+def send_digests(period, now=None):
+    sent = 0
+    for user_settings in due_digest_settings(period, now).iterator():
+        sent += send_digest(user_settings, now)
+    return sent
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from posts.models import Post
+
+from .models import PostEvent
+
+
+@receiver(post_save, sender=Post)
+def record_post_event(sender, instance, created, **kwargs):
+    if created:
+        PostEvent.objects.create(post=instance)
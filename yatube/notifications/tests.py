@@ -0,0 +1,109 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.deletion import schedule_post_deletion
+from posts.models import Follow, Post
+
+from .models import Notification, NotificationSettings, PostEvent
+from .services import fan_out_chunk, process_events, send_digests
+
+User = get_user_model()
+
+NUM_OF_FOLLOWERS = 5
+
+
+class NotificationsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.followers = [
+            User.objects.create_user(
+                username=f'follower{i}', email=f'follower{i}@yatube.ru')
+            for i in range(NUM_OF_FOLLOWERS)]
+        Follow.objects.bulk_create(
+            Follow(user=follower, author=self.author)
+            for follower in self.followers)
+        self.post = Post.objects.create(author=self.author, text='Новый пост')
+
+    def test_post_creates_single_event(self):
+        """Публикация поста записывает одно событие, а не уведомления."""
+        self.assertEqual(PostEvent.objects.filter(post=self.post).count(), 1)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_post_create_view_records_event(self):
+        """Пост, созданный через форму, тоже порождает событие."""
+        self.client.force_login(self.author)
+        self.client.post(reverse('posts:post_create'), {'text': 'Ещё пост'})
+        self.assertTrue(
+            PostEvent.objects.filter(post__text='Ещё пост').exists())
+
+    def test_fan_out_in_chunks(self):
+        """Событие раздаётся подписчикам порциями."""
+        event = PostEvent.objects.get(post=self.post)
+        self.assertEqual(fan_out_chunk(event, chunk_size=3), 3)
+        self.assertFalse(event.processed)
+        self.assertEqual(fan_out_chunk(event, chunk_size=3), 2)
+        self.assertTrue(event.processed)
+        self.assertEqual(
+            Notification.objects.filter(post=self.post).count(),
+            NUM_OF_FOLLOWERS)
+
+    def test_process_events_is_idempotent(self):
+        """Повторная обработка не создаёт дублей уведомлений."""
+        process_events(chunk_size=2)
+        PostEvent.objects.update(processed=False, last_follow_id=0)
+        call_command('process_notifications', chunk_size=2)
+        self.assertEqual(Notification.objects.count(), NUM_OF_FOLLOWERS)
+        self.assertFalse(PostEvent.objects.filter(processed=False).exists())
+
+    def test_unread_notifications_page(self):
+        """Непрочитанные уведомления видны на странице и отмечаются
+        прочитанными."""
+        process_events()
+        self.client.force_login(self.followers[0])
+        response = self.client.get(reverse('notifications:index'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, self.post.text)
+        response = self.client.get(reverse('notifications:mark_all_read'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        self.client.post(reverse('notifications:mark_all_read'))
+        response = self.client.get(reverse('notifications:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_deleted_posts_are_hidden(self):
+        """Уведомления об удалённых постах не показываются."""
+        process_events()
+        schedule_post_deletion([self.post])
+        self.client.force_login(self.followers[0])
+        response = self.client.get(reverse('notifications:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_notifications_page_requires_login(self):
+        """Страница уведомлений недоступна анонимному пользователю."""
+        response = self.client.get(reverse('notifications:index'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_hourly_digest(self):
+        """Дайджест отправляется раз в период и только с новыми
+        уведомлениями."""
+        process_events()
+        NotificationSettings.objects.create(
+            user=self.followers[0], digest=NotificationSettings.HOURLY)
+        with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.locmem.'
+                              'EmailBackend'):
+            self.assertEqual(send_digests(NotificationSettings.HOURLY), 1)
+            self.assertEqual(send_digests(NotificationSettings.HOURLY), 0)
+            self.assertEqual(send_digests(
+                NotificationSettings.HOURLY,
+                now=timezone.now() + timedelta(hours=2)), 0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(self.post.text, mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].to, ['follower0@yatube.ru'])
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'notifications'
+
+urlpatterns = [
+    path('', views.index, name='index'),
+    path('read/', views.mark_all_read, name='mark_all_read'),
+    path('settings/', views.update_settings, name='update_settings'),
+]
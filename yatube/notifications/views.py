@@ -0,0 +1,45 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_POST
+
+from posts.counters import attach_likes
+from posts.views import paginator
+
+from .forms import NotificationSettingsForm
+from .models import NotificationSettings
+
+
+@login_required
+def index(request):
+    notifications = request.user.notifications.filter(
+        is_read=False, post__is_deleted=False,
+        post__author__is_active=True,
+    ).select_related('post__author', 'post__group')
+    page_obj = paginator(request=request, posts=notifications)
+    attach_likes(
+        (notification.post for notification in page_obj), request.user)
+    user_settings, _ = NotificationSettings.objects.get_or_create(
+        user=request.user)
+    context = {
+        'page_obj': page_obj,
+        'form': NotificationSettingsForm(instance=user_settings),
+    }
+    return render(request, 'notifications/index.html', context)
+
+
+@require_POST
+@login_required
+def mark_all_read(request):
+    request.user.notifications.filter(is_read=False).update(is_read=True)
+    return redirect('notifications:index')
+
+
+@login_required
+def update_settings(request):
+    user_settings, _ = NotificationSettings.objects.get_or_create(
+        user=request.user)
+    form = NotificationSettingsForm(request.POST or None,
+                                    instance=user_settings)
+    if form.is_valid():
+        form.save()
+    return redirect('notifications:index')
@@ -1,32 +1,210 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import (
+    ALL_VAR, IS_POPUP_VAR, ORDER_VAR, PAGE_VAR, SEARCH_VAR, TO_FIELD_VAR)
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.forms import ModelForm
 
-from .models import Comment, Follow, Group, Post
+from core.paginator import EstimatedCountPaginator
 
+from . import search
+from .deletion import (cascade_lookups, schedule_group_deletion,
+                       schedule_post_deletion)
+from .models import Comment, Follow, Group, Like, Post, Tag
 
-class PostAdmin(admin.ModelAdmin):
+User = get_user_model()
+
+SEARCH_COUNT_LIMIT = 1000
+
+
+class DeferredDeletionMixin:
+    """Удаление из админки только помечает объекты, а сами записи
+    удаляет команда process_deletions порциями."""
+
+    schedule_deletion = None
+
+    def delete_model(self, request, obj):
+        self.schedule_deletion([obj])
+
+    def delete_queryset(self, request, queryset):
+        self.schedule_deletion(queryset)
+
+    def get_deleted_objects(self, objs, request):
+        # Не собираем в памяти все каскадно удаляемые объекты, а права на
+        # удаление проверяем, как Django, но по моделям: для каждой
+        # зарегистрированной в админке модели, у которой есть
+        # затронутые записи.
+        objs = list(objs)
+        pks = [obj.pk for obj in objs]
+        perms_needed = set()
+        for model, lookup in cascade_lookups(self.model):
+            model_admin = self.admin_site._registry.get(model)
+            if (model_admin is None
+                    or model_admin.has_delete_permission(request)):
+                continue
+            if model._base_manager.filter(**{lookup: pks}).exists():
+                perms_needed.add(model._meta.verbose_name)
+        return [str(obj) for obj in objs], {}, perms_needed, []
+
+
+class PrefetchedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое берёт выбранный объект из уже загруженной
+    строки списка, а не запрашивает его заново для каждой строки."""
+
+    known_objects = None
+
+    def optgroups(self, name, value, attr=None):
+        if self.known_objects is None:
+            return super().optgroups(name, value, attr)
+        default = (None, [], 0)
+        selected_choices = {
+            str(v) for v in value
+            if str(v) not in self.choices.field.empty_values
+        }
+        if not self.is_required and not self.allow_multiple_selected:
+            default[1].append(self.create_option(name, '', '', False, 0))
+        for pk, obj in self.known_objects.items():
+            if str(pk) not in selected_choices:
+                continue
+            label = self.choices.field.label_from_instance(obj)
+            default[1].append(self.create_option(
+                name, pk, label, True, len(default[1])))
+        return [default]
+
+
+class ChangeListForm(ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if not isinstance(widget, PrefetchedAutocompleteSelect):
+                continue
+            model_field = self.instance._meta.get_field(name)
+            if model_field.is_cached(self.instance):
+                related = model_field.get_cached_value(self.instance)
+                widget.known_objects = (
+                    {related.pk: related} if related else {})
+
+
+class ScalableAdminMixin:
+    """Списки объектов для больших таблиц: связанные объекты загружаются
+    одним запросом, число строк оценивается, а не считается."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Поля, по которым ищем точным совпадением имени пользователя.
+    username_search_fields = ()
+    # Текстовые поля, по которым ищем подстроку без учёта регистра.
+    text_search_fields = ()
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        # Без фильтров и поиска точное число строк не нужно.
+        unfiltered = not set(request.GET) - {
+            ALL_VAR, IS_POPUP_VAR, ORDER_VAR, PAGE_VAR, TO_FIELD_VAR}
+        # Поиск по подстроке не использует индекс: считаем не все
+        # найденные строки, а только первые SEARCH_COUNT_LIMIT.
+        count_limit = (SEARCH_COUNT_LIMIT
+                       if self.text_search_fields
+                       and request.GET.get(SEARCH_VAR) else None)
+        return self.paginator(queryset, per_page, orphans,
+                              allow_empty_first_page, estimate=unfiltered,
+                              count_limit=count_limit)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', PrefetchedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', ChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not self.username_search_fields:
+            return super().get_search_results(
+                request, queryset, search_term)
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        # username уникален и проиндексирован, поэтому вместо LIKE по
+        # всей таблице ищем пользователя и фильтруем по внешнему ключу.
+        user_ids = User.objects.filter(
+            username=search_term).values('pk')
+        condition = Q()
+        for field in self.username_search_fields:
+            condition |= Q(**{f'{field}__in': user_ids})
+        for field in self.text_search_fields:
+            condition |= Q(**{f'{field}__icontains': search_term})
+        return queryset.filter(condition), False
+
+
+class PostAdmin(ScalableAdminMixin, DeferredDeletionMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    schedule_deletion = staticmethod(schedule_post_deletion)
+
+    def get_queryset(self, request):
+        # Админка видит и посты удаляемых авторов.
+        return Post.all_objects.filter(is_deleted=False)
 
+    def get_search_results(self, request, queryset, search_term):
+        return search.search(queryset, search_term), False
 
-class GroupAdmin(admin.ModelAdmin):
+
+class GroupAdmin(DeferredDeletionMixin, admin.ModelAdmin):
     list_display = ('pk', 'title', 'description')
     search_fields = ('title',)
+    schedule_deletion = staticmethod(schedule_group_deletion)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(is_deleted=False)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'post', 'author', 'created')
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
     list_filter = ('created',)
-    search_fields = ('text',)
+    date_hierarchy = 'created'
+    search_fields = ('author__username', 'text')
+    username_search_fields = ('author',)
+    text_search_fields = ('text',)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('pk', 'author', 'user')
+    list_select_related = ('author', 'user')
+    autocomplete_fields = ('author', 'user')
+    search_fields = ('author__username', 'user__username')
+    username_search_fields = ('author', 'user')
+
+
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name')
+    search_fields = ('=name',)
+
+
+class LikeAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'post', 'user', 'created')
+    list_select_related = ('post', 'user')
+    autocomplete_fields = ('post', 'user')
+    search_fields = ('user__username',)
+    username_search_fields = ('user',)
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(Like, LikeAdmin)
+admin.site.register(Tag, TagAdmin)
@@ -0,0 +1,104 @@
+from core import cache_tags
+
+FEED_TAG = 'feed'
+SITEMAP_CHUNK_SIZE = 5000
+ROWS_TIMEOUT = 60 * 60
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def author_tag(author_id):
+    return f'author:{author_id}'
+
+
+def group_tag(group_id):
+    return f'group:{group_id}'
+
+
+def follower_tag(user_id):
+    return f'follower:{user_id}'
+
+
+def sitemap_chunk(pk):
+    return (pk - 1) // SITEMAP_CHUNK_SIZE
+
+
+def sitemap_chunk_tag(section, chunk):
+    return f'sitemap:{section}:{chunk}'
+
+
+def sitemap_tag(section, pk):
+    """Тег файла карты сайта, в который попадает объект с этим pk."""
+    return sitemap_chunk_tag(section, sitemap_chunk(pk))
+
+
+def rows_tag(tag):
+    return f'rows:{tag}'
+
+
+def card_tags(post):
+    """Теги страниц, на которых есть карточка поста."""
+    tags = {FEED_TAG, post_tag(post.pk), author_tag(post.author_id)}
+    if post.group_id:
+        tags.add(group_tag(post.group_id))
+    return tags
+
+
+def post_tags(post):
+    """Теги всех страниц, на которых показывается пост."""
+    return card_tags(post) | {sitemap_tag('posts', post.pk)}
+
+
+def page_tags(posts):
+    """Теги авторов и групп карточек на странице ленты."""
+    tags = set()
+    for post in posts:
+        tags.add(author_tag(post.author_id))
+        if post.group_id:
+            tags.add(group_tag(post.group_id))
+    return tags
+
+
+def invalidate(*tags, rows=True):
+    """Сбрасывает страницы с этими тегами.
+
+    rows=False оставляет выборки cached_rows: они сами дочитывают новые
+    строки, поэтому при добавлении объекта их сбрасывать не нужно.
+    """
+    if rows:
+        tags += tuple(rows_tag(tag) for tag in tags)
+    cache_tags.invalidate(*tags)
+
+
+def _fetch_rows(queryset, fields, limit):
+    if limit is None:
+        return list(queryset.order_by('pk').values_list(*fields))
+    return list(queryset.order_by('-pk').values_list(*fields)[:limit])[::-1]
+
+
+def cached_rows(key, tags, queryset, fields, limit=None):
+    """Строки запроса в порядке pk, которые пересчитываются не целиком.
+
+    При повторном чтении из базы выбираются только строки с pk больше
+    последнего закешированного. limit оставляет только последние строки.
+    Первым в fields должен быть 'pk'.
+    """
+    entry = cache_tags.get_tagged(key)
+    if entry is None:
+        rows = _fetch_rows(queryset, fields, limit)
+        last_pk = rows[-1][0] if rows else 0
+    else:
+        last_pk, rows = entry
+        new_rows = _fetch_rows(
+            queryset.filter(pk__gt=last_pk), fields, limit)
+        if not new_rows:
+            return rows
+        rows = rows + new_rows
+        if limit is not None:
+            rows = rows[-limit:]
+        last_pk = rows[-1][0]
+    cache_tags.set_tagged(
+        key, (last_pk, rows), [rows_tag(tag) for tag in tags], ROWS_TIMEOUT)
+    return rows
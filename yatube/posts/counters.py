@@ -0,0 +1,106 @@
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.counters import BufferedCounter
+
+from .cache import card_tags, invalidate
+from .models import Comment, Like, Post
+
+BATCH_SIZE = 1000
+
+likes = BufferedCounter('likes', Post, 'likes_count')
+views = BufferedCounter('views', Post, 'views_count')
+
+
+def count_view(post_id):
+    """Учитывает просмотр поста.
+
+    При VIEW_COUNTER_SAMPLE_RATE < 1 учитывается только доля просмотров,
+    каждый с весом 1 / rate, что снижает нагрузку на кеш. Дробный вес
+    округляется случайно (3.3 — до 4 с вероятностью 0.3), поэтому в
+    среднем счётчик не смещается.
+    """
+    rate = getattr(settings, 'VIEW_COUNTER_SAMPLE_RATE', 1)
+    if rate >= 1:
+        views.incr(post_id)
+    elif random.random() < rate:
+        weight = 1 / rate
+        whole = int(weight)
+        views.incr(post_id, whole + (random.random() < weight - whole))
+
+
+def attach_likes(posts, user=None):
+    """Проставляет постам likes_total: сохранённое число отметок вместе
+    с ещё не записанными в базу, а для залогиненного user ещё и is_liked."""
+    posts = list(posts)
+    buffered = likes.get_many([post.pk for post in posts])
+    liked = set()
+    if user is not None and user.is_authenticated and posts:
+        liked = set(Like.objects.filter(
+            user=user, post__in=[post.pk for post in posts],
+        ).values_list('post_id', flat=True))
+    for post in posts:
+        post.likes_total = post.likes_count + buffered[post.pk]
+        post.is_liked = post.pk in liked
+    return posts
+
+
+def real_comments_count():
+    # Комментарии заблокированных и удаляемых авторов на странице поста
+    # не показываются и в числе комментариев не учитываются.
+    return Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk'), author__is_active=True)
+        .order_by().values('post').annotate(count=Count('pk'))
+        .values('count'),
+        output_field=IntegerField()), 0)
+
+
+def recount_comments(batch_size=BATCH_SIZE):
+    """Пересчитывает Post.comments_count порциями по pk.
+
+    Обновляются только посты с расхождением, возвращается их число.
+    """
+    fixed = 0
+    last_pk = 0
+    while True:
+        pks = list(
+            Post.all_objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return fixed
+        last_pk = pks[-1]
+        with transaction.atomic():
+            posts = list(
+                Post.all_objects.filter(pk__in=pks)
+                .annotate(real_count=real_comments_count())
+                .exclude(comments_count=F('real_count'))
+                .only('pk', 'author_id', 'group_id'))
+            Post.all_objects.filter(
+                pk__in=[post.pk for post in posts]).update(
+                    comments_count=real_comments_count())
+        tags = set()
+        for post in posts:
+            tags |= card_tags(post)
+        invalidate(*tags, rows=False)
+        fixed += len(posts)
+
+
+def recount_commented_posts(user_ids):
+    """Пересчитывает число комментариев постов, которые комментировали
+    пользователи, после их блокировки, удаления или разблокировки."""
+    posts = list(
+        Post.all_objects.filter(comments__author_id__in=user_ids)
+        .distinct().only('pk', 'author_id', 'group_id'))
+    if not posts:
+        return 0
+    Post.all_objects.filter(pk__in=[post.pk for post in posts]).update(
+        comments_count=real_comments_count())
+    tags = set()
+    for post in posts:
+        tags |= card_tags(post)
+    invalidate(*tags, rows=False)
+    return len(posts)
@@ -0,0 +1,225 @@
+"""Отложенное удаление пользователей, постов и групп.
+
+Объект сразу помечается удалённым и пропадает из лент, а связанные
+записи удаляются фоновой командой process_deletions небольшими порциями,
+каждая в своей короткой транзакции.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import models, transaction
+
+from core.auth import invalidate_user
+
+from . import lookups
+from .cache import (FEED_TAG, author_tag, group_tag, invalidate, post_tags,
+                    sitemap_tag)
+from .counters import recount_commented_posts
+from .models import Group, PendingDeletion, Post
+
+User = get_user_model()
+
+CHUNK_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+class Purging(threading.local):
+    """Посты и авторы, чьи связанные записи сейчас удаляются порциями.
+
+    Сигналы комментариев и отметок не пересчитывают счётчики и не
+    сбрасывают кеш для поста, который удаляется следом, и для
+    комментариев автора, уже исключённых из счётчиков при его пометке.
+    """
+
+    def __init__(self):
+        self.posts = set()
+        self.authors = set()
+
+
+purging = Purging()
+
+
+@contextmanager
+def _purging(ids, pk):
+    ids.add(pk)
+    try:
+        yield
+    finally:
+        ids.discard(pk)
+
+
+def _enqueue(kind, ids):
+    PendingDeletion.objects.bulk_create(
+        [PendingDeletion(kind=kind, object_id=pk) for pk in ids],
+        ignore_conflicts=True)
+
+
+def schedule_post_deletion(posts):
+    posts = list(posts)
+    Post.all_objects.filter(
+        pk__in=[post.pk for post in posts]).update(is_deleted=True)
+    _enqueue(PendingDeletion.POST, [post.pk for post in posts])
+    tags = set()
+    for post in posts:
+        tags |= post_tags(post)
+    invalidate(*tags)
+
+
+def schedule_user_deletion(users):
+    users = list(users)
+    user_ids = [user.pk for user in users]
+    User.objects.filter(pk__in=user_ids).update(is_active=False)
+    invalidate_user(*user_ids)
+    recount_commented_posts(user_ids)
+    lookups.authors.invalidate()
+    _enqueue(PendingDeletion.USER, user_ids)
+    group_ids = (
+        Post.all_objects.filter(author_id__in=user_ids, group__isnull=False)
+        .values_list('group_id', flat=True).distinct())
+    invalidate(
+        FEED_TAG,
+        *(author_tag(user_id) for user_id in user_ids),
+        *(sitemap_tag('profiles', user_id) for user_id in user_ids),
+        *(group_tag(group_id) for group_id in group_ids))
+
+
+def cancel_user_deletion(user_ids):
+    """Снимает отложенное удаление с пользователей, которых снова
+    сделали активными."""
+    PendingDeletion.objects.filter(
+        kind=PendingDeletion.USER, object_id__in=user_ids).delete()
+
+
+def schedule_group_deletion(groups):
+    groups = list(groups)
+    Group.objects.filter(
+        pk__in=[group.pk for group in groups]).update(is_deleted=True)
+    lookups.groups.invalidate()
+    _enqueue(PendingDeletion.GROUP, [group.pk for group in groups])
+    invalidate(
+        *(group_tag(group.pk) for group in groups),
+        *(sitemap_tag('groups', group.pk) for group in groups))
+
+
+def delete_in_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Удаляет записи порциями по chunk_size в отдельных транзакциях."""
+    model = queryset.model
+    queryset = queryset.order_by('pk')
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        with transaction.atomic():
+            deleted += model._base_manager.filter(pk__in=pks).delete()[0]
+
+
+def purge_related(instance, chunk_size=CHUNK_SIZE, exclude=()):
+    """Порциями удаляет все записи, которые удалились бы каскадом."""
+    for relation in instance._meta.related_objects:
+        if (relation.on_delete is not models.CASCADE
+                or relation.many_to_many
+                or relation.related_model in exclude):
+            continue
+        queryset = relation.related_model._base_manager.filter(
+            **{relation.field.name: instance})
+        delete_in_chunks(queryset, chunk_size)
+
+
+def cascade_lookups(model, path='in', seen=()):
+    """Модели, записи которых удалились бы каскадом вместе с объектами
+    model, и условия для их поиска по списку первичных ключей:
+    (Comment, 'post__author__in') для пользователя."""
+    seen = seen + (model,)
+    for relation in model._meta.related_objects:
+        related_model = relation.related_model
+        if (relation.on_delete is not models.CASCADE
+                or relation.many_to_many or related_model in seen):
+            continue
+        lookup = f'{relation.field.name}__{path}'
+        yield related_model, lookup
+        yield from cascade_lookups(related_model, lookup, seen)
+
+
+def delete_image_files(image):
+    """Удаляет файл картинки и её миниатюры."""
+    from sorl.thumbnail import delete
+
+    try:
+        delete(image)
+    except (OSError, SuspiciousFileOperation) as error:
+        logger.warning('Не удалось удалить файл %s: %s', image.name, error)
+
+
+def delete_image(image):
+    """Удаляет картинку и её миниатюры, если на файл больше не ссылаются
+    другие посты."""
+    release = getattr(image.storage, 'release', None)
+    if release is not None and release(image.name):
+        return
+    delete_image_files(image)
+
+
+def delete_post(post_id, chunk_size=CHUNK_SIZE):
+    post = Post.all_objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    with _purging(purging.posts, post_id):
+        purge_related(post, chunk_size)
+    with transaction.atomic():
+        post.delete()
+    if post.image:
+        delete_image(post.image)
+
+
+def delete_user(user_id, chunk_size=CHUNK_SIZE):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    posts = Post.all_objects.filter(author_id=user_id)
+    while True:
+        post_ids = list(posts.values_list('pk', flat=True)[:chunk_size])
+        if not post_ids:
+            break
+        for post_id in post_ids:
+            delete_post(post_id, chunk_size)
+    with _purging(purging.authors, user_id):
+        purge_related(user, chunk_size, exclude=(Post,))
+    with transaction.atomic():
+        user.delete()
+
+
+def delete_group(group_id, chunk_size=CHUNK_SIZE):
+    group = Group.objects.filter(pk=group_id).first()
+    if group is None:
+        return
+    posts = Post.all_objects.filter(group_id=group_id)
+    while True:
+        post_ids = list(posts.values_list('pk', flat=True)[:chunk_size])
+        if not post_ids:
+            break
+        with transaction.atomic():
+            Post.all_objects.filter(pk__in=post_ids).update(group=None)
+    with transaction.atomic():
+        group.delete()
+
+
+HANDLERS = {
+    PendingDeletion.POST: delete_post,
+    PendingDeletion.USER: delete_user,
+    PendingDeletion.GROUP: delete_group,
+}
+
+
+def process_pending(chunk_size=CHUNK_SIZE, limit=None):
+    """Выполняет отложенные удаления. Возвращает число обработанных."""
+    processed = 0
+    for task in PendingDeletion.objects.all()[:limit]:
+        HANDLERS[task.kind](task.object_id, chunk_size)
+        task.delete()
+        processed += 1
+    return processed
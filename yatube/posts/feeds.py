@@ -0,0 +1,106 @@
+"""Карта сайта и RSS/Atom-ленты.
+
+Выборки идут по первичному ключу (без OFFSET) и кешируются через
+cached_rows, которая при появлении новых объектов дочитывает только их.
+Файлы карты сайта нарезаны по диапазонам pk, поэтому новый пост меняет
+только последний файл.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import feedgenerator
+
+from .cache import (FEED_TAG, SITEMAP_CHUNK_SIZE, author_tag, cached_rows,
+                    group_tag, sitemap_chunk_tag)
+from .models import Group, Post
+
+User = get_user_model()
+
+FEED_SIZE = 20
+FEED_TYPES = {
+    'rss': feedgenerator.Rss201rev2Feed,
+    'atom': feedgenerator.Atom1Feed,
+}
+TITLE_LENGTH = 50
+
+SITEMAP_SECTIONS = {
+    'posts': (
+        lambda: Post.objects.all(),
+        ('pk', 'pub_date'),
+        lambda row: reverse('posts:post_detail', args=(row[0],)),
+    ),
+    'groups': (
+        lambda: Group.objects.filter(is_deleted=False),
+        ('pk', 'slug'),
+        lambda row: reverse('posts:group_list', args=(row[1],)),
+    ),
+    'profiles': (
+        lambda: User.objects.filter(is_active=True),
+        ('pk', 'username'),
+        lambda row: reverse('posts:profile', args=(row[1],)),
+    ),
+}
+
+
+def sitemap_chunks():
+    """Номера файлов карты сайта для каждого раздела."""
+    chunks = {}
+    for section, (get_queryset, _, _) in SITEMAP_SECTIONS.items():
+        model = get_queryset().model
+        max_pk = model._base_manager.aggregate(max_pk=Max('pk'))['max_pk']
+        chunks[section] = range(
+            (max_pk + SITEMAP_CHUNK_SIZE - 1) // SITEMAP_CHUNK_SIZE
+            if max_pk else 0)
+    return chunks
+
+
+def sitemap_urls(section, chunk):
+    """Пары (адрес, дата изменения) одного файла карты сайта."""
+    get_queryset, fields, location = SITEMAP_SECTIONS[section]
+    low = chunk * SITEMAP_CHUNK_SIZE
+    queryset = get_queryset().filter(
+        pk__gt=low, pk__lte=low + SITEMAP_CHUNK_SIZE)
+    rows = cached_rows(
+        f'sitemap:{section}:{chunk}',
+        [sitemap_chunk_tag(section, chunk)], queryset, fields)
+    lastmod = fields[1] == 'pub_date'
+    return [(location(row), row[1] if lastmod else None) for row in rows]
+
+
+def feed_items(key, tags, queryset):
+    return cached_rows(
+        f'syndication:{key}', tags, queryset,
+        ('pk', 'text', 'pub_date', 'author__username'), limit=FEED_SIZE)
+
+
+def index_items():
+    return feed_items('index', [FEED_TAG], Post.objects.all())
+
+
+def group_items(group):
+    return feed_items(
+        f'group:{group.pk}', [group_tag(group.pk)], group.posts.all())
+
+
+def author_items(author):
+    return feed_items(
+        f'author:{author.pk}', [author_tag(author.pk)], author.posts.all())
+
+
+def render_feed(request, feed_type, title, link, description, items):
+    feed = FEED_TYPES[feed_type](
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=description,
+        language='ru',
+        feed_url=request.build_absolute_uri())
+    for pk, text, pub_date, username in reversed(items):
+        feed.add_item(
+            title=text[:TITLE_LENGTH],
+            link=request.build_absolute_uri(
+                reverse('posts:post_detail', args=(pk,))),
+            description=text,
+            author_name=username,
+            pubdate=pub_date,
+            unique_id=str(pk))
+    return feed
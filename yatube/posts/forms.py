@@ -1,8 +1,11 @@
 import re
 
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Comment, Post
+from core.validators import validate_image_header
+
+from .models import Comment, Group, Post
 
 
 class PostForm(forms.ModelForm):
@@ -10,6 +13,11 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'].queryset = Group.objects.filter(
+            is_deleted=False)
+
     def clean_text(self):
         text = self.cleaned_data['text']
         stop_words = ['мат', 'война']
@@ -19,6 +27,12 @@ class PostForm(forms.ModelForm):
                     f'Слово "{word}" запрещено в тексте поста')
         return text
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            validate_image_header(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
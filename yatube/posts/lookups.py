@@ -0,0 +1,48 @@
+"""Поиск групп и авторов по slug и имени пользователя через кеш в памяти
+процесса (core.local_cache). Кеши сбрасываются из posts.signals.
+
+В кеше лежат только значения нужных страницам полей (у автора — без
+хеша пароля), а каждый вызов собирает из них новый объект модели.
+"""
+from django.contrib.auth import get_user_model
+from django.http import Http404
+
+from core.local_cache import LocalCache
+
+from .models import Group
+
+User = get_user_model()
+
+GROUP_FIELDS = ('id', 'title', 'slug', 'description', 'is_deleted')
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name', 'is_active')
+
+groups = LocalCache('groups')
+authors = LocalCache('authors')
+
+
+def load_values(model, fields, **lookup):
+    values = model._default_manager.filter(**lookup).values_list(
+        *fields).first()
+    if values is None:
+        raise Http404(
+            f'No {model._meta.object_name} matches the given query.')
+    return values
+
+
+def from_values(model, fields, values):
+    """Объект модели с загруженными fields, остальные поля отложены."""
+    return model.from_db(model._default_manager.db, fields, values)
+
+
+def get_group_or_404(slug):
+    values = groups.get_or_load(
+        slug, lambda: load_values(
+            Group, GROUP_FIELDS, slug=slug, is_deleted=False))
+    return from_values(Group, GROUP_FIELDS, values)
+
+
+def get_author_or_404(username):
+    values = authors.get_or_load(
+        username, lambda: load_values(
+            User, AUTHOR_FIELDS, username=username, is_active=True))
+    return from_values(User, AUTHOR_FIELDS, values)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.tags import sync_tags
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Разбирает хештеги в уже существующих постах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько постов обрабатывать за один проход.')
+
+    def handle(self, *args, **options):
+        removed = added = 0
+        last_pk = 0
+        while True:
+            # Порции по pk: в памяти не больше batch_size постов.
+            posts = list(
+                Post.all_objects.filter(pk__gt=last_pk).order_by('pk')
+                .only('pk', 'text', 'pub_date')[:options['batch_size']])
+            if not posts:
+                break
+            last_pk = posts[-1].pk
+            batch_removed, batch_added = sync_tags(posts)
+            removed += batch_removed
+            added += batch_added
+        self.stdout.write(
+            f'Добавлено связей: {added}, удалено связей: {removed}')
@@ -0,0 +1,139 @@
+import os
+import time
+from bisect import bisect_left
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.models import StoredFile
+from posts.models import Post
+
+BATCH_SIZE = 1000
+GRACE_HOURS = 24
+
+
+def scan_files(root, directory):
+    """Перебирает файлы каталога рекурсивно, не собирая список целиком.
+
+    Возвращает пары (имя относительно root через '/', время изменения).
+    """
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, root)
+                    yield (name.replace(os.sep, '/'),
+                           entry.stat(follow_symlinks=False).st_mtime)
+
+
+def referenced_names(batch_size):
+    """Отсортированный список имён картинок, на которые ссылаются посты."""
+    names = list(
+        Post.all_objects.exclude(image='').order_by()
+        .values_list('image', flat=True).distinct()
+        .iterator(chunk_size=batch_size))
+    names.sort()
+    return names
+
+
+def contains(sorted_names, name):
+    index = bisect_left(sorted_names, name)
+    return index < len(sorted_names) and sorted_names[index] == name
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки постов, на которые больше никто не '
+            'ссылается, вместе с их миниатюрами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=GRACE_HOURS,
+            help='Не трогать файлы моложе этого числа часов.')
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько файлов перепроверять в базе за один запрос.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.storage = Post._meta.get_field('image').storage
+        batch_size = options['batch_size']
+        upload_to = Post._meta.get_field('image').upload_to
+        directory = self.storage.path(upload_to)
+        deadline = time.time() - options['grace_hours'] * 60 * 60
+        self.deleted = self.freed = 0
+        scanned = 0
+        if os.path.isdir(directory):
+            referenced = referenced_names(batch_size)
+            candidates = []
+            for name, mtime in scan_files(self.storage.location, directory):
+                scanned += 1
+                if mtime > deadline or contains(referenced, name):
+                    continue
+                candidates.append(name)
+                if len(candidates) >= batch_size:
+                    self.delete_orphans(candidates)
+                    candidates = []
+            self.delete_orphans(candidates)
+        fixed = 0 if self.dry_run else self.sync_refcounts(batch_size)
+        deleted_label = 'Будет удалено' if self.dry_run else 'Удалено'
+        self.stdout.write(
+            f'Проверено файлов: {scanned}. {deleted_label} файлов: '
+            f'{self.deleted} ({self.freed} байт). '
+            f'Исправлено счётчиков ссылок: {fixed}')
+
+    def delete_orphans(self, names):
+        """Удаляет файлы, перепроверив ссылки на них в базе: пост мог
+        сослаться на уже существующий файл уже после загрузки списка."""
+        from sorl.thumbnail import delete
+        from sorl.thumbnail.images import ImageFile
+
+        if not names:
+            return
+        still_used = set(
+            Post.all_objects.filter(image__in=names)
+            .values_list('image', flat=True))
+        for name in names:
+            if name in still_used:
+                continue
+            try:
+                size = self.storage.size(name)
+            except OSError:
+                continue
+            self.deleted += 1
+            self.freed += size
+            if self.dry_run:
+                self.stdout.write(name)
+                continue
+            delete(ImageFile(name, self.storage))
+        if not self.dry_run:
+            StoredFile.objects.filter(name__in=names).exclude(
+                name__in=still_used).delete()
+
+    def sync_refcounts(self, batch_size):
+        """Сверяет StoredFile.refcount с настоящим числом постов."""
+        fixed = 0
+        last_pk = 0
+        while True:
+            files = list(
+                StoredFile.objects.filter(pk__gt=last_pk).order_by('pk')
+                [:batch_size])
+            if not files:
+                return fixed
+            last_pk = files[-1].pk
+            counts = dict(
+                Post.all_objects.filter(image__in=[f.name for f in files])
+                .order_by().values('image').annotate(count=Count('pk'))
+                .values_list('image', 'count'))
+            for stored in files:
+                refcount = counts.get(stored.name, 0)
+                if stored.refcount != refcount:
+                    # Не затираем ссылку, добавленную после подсчёта.
+                    fixed += StoredFile.objects.filter(
+                        pk=stored.pk, refcount=stored.refcount).update(
+                            refcount=refcount)
@@ -0,0 +1,87 @@
+import os
+import re
+
+from django.core.management.base import BaseCommand
+
+from core.storage import file_digest
+from posts.cache import card_tags, invalidate
+from posts.models import Post
+
+BATCH_SIZE = 500
+HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+class Command(BaseCommand):
+    help = ('Переводит картинки постов на имена из хеша содержимого '
+            'и удаляет повторяющиеся копии.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько постов обрабатывать за один проход.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет сделано.')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.storage = Post._meta.get_field('image').storage
+        self.renamed = {}
+        self.targets = set()
+        self.moved = self.merged = self.missing = 0
+        last_pk = 0
+        while True:
+            posts = list(
+                Post.all_objects.filter(pk__gt=last_pk).exclude(image='')
+                .order_by('pk').only('pk', 'image', 'author', 'group')
+                [:options['batch_size']])
+            if not posts:
+                break
+            last_pk = posts[-1].pk
+            for post in posts:
+                if HASHED_NAME_RE.search(post.image.name):
+                    continue
+                new_name = self.rename(post.image)
+                if new_name is None or self.dry_run:
+                    continue
+                Post.all_objects.filter(pk=post.pk).update(image=new_name)
+                self.storage.retain(new_name)
+                invalidate(*card_tags(post), rows=False)
+        moved_label = 'Будет перенесено' if self.dry_run else 'Перенесено'
+        self.stdout.write(
+            f'{moved_label} файлов: {self.moved}, '
+            f'удалено копий: {self.merged}, не найдено: {self.missing}')
+
+    def rename(self, image):
+        """Переносит файл на имя из хеша или удаляет его, если такой файл
+        уже есть. Возвращает новое имя или None, если файла нет."""
+        from sorl.thumbnail import delete
+
+        old_name = image.name
+        if old_name in self.renamed:
+            return self.renamed[old_name]
+        if not self.storage.exists(old_name):
+            self.missing += 1
+            return None
+        with self.storage.open(old_name) as content:
+            new_name = self.storage.hashed_name(
+                old_name, file_digest(content))
+        exists = (new_name in self.targets
+                  or self.storage.exists(new_name))
+        self.renamed[old_name] = new_name
+        self.targets.add(new_name)
+        if exists:
+            self.merged += 1
+        else:
+            self.moved += 1
+        if self.dry_run:
+            return new_name
+        # Миниатюры привязаны к старому имени.
+        delete(image, delete_file=False)
+        if exists:
+            self.storage.delete(old_name)
+        else:
+            new_path = self.storage.path(new_name)
+            os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            os.replace(self.storage.path(old_name), new_path)
+        return new_name
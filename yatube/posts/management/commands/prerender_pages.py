@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.prerender import BATCH_SIZE, process_pending, render_all
+
+
+class Command(BaseCommand):
+    help = ('Сохраняет статические копии страниц групп, профилей и '
+            'страниц «Об авторе» для анонимных посетителей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перерисовать все страницы, а не только из очереди.')
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько задач очереди брать за один проход.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать непрерывно, опрашивая очередь.')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проходами в режиме --loop, секунды.')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            self.stdout.write(f'Сохранено страниц: {render_all()}')
+        batch_size = options['batch_size']
+        while True:
+            processed = batch = process_pending(batch_size)
+            while batch == batch_size:
+                batch = process_pending(batch_size)
+                processed += batch
+            if processed:
+                self.stdout.write(f'Обработано задач: {processed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.deletion import CHUNK_SIZE, process_pending
+
+
+class Command(BaseCommand):
+    help = ('Удаляет помеченных на удаление пользователей, посты и группы '
+            'вместе со связанными записями и картинками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Сколько записей удалять в одной транзакции.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать непрерывно, опрашивая очередь.')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проходами в режиме --loop, секунды.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending(options['chunk_size'])
+            if processed:
+                self.stdout.write(f'Удалено объектов: {processed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
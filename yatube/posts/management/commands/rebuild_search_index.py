@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает полнотекстовый индекс постов, например после '
+            'массовой загрузки через bulk_create.')
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write('Полнотекстовый индекс не поддерживается.')
+            return
+        search.rebuild()
+        self.stdout.write('Индекс перестроен.')
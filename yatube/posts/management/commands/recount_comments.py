@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import BATCH_SIZE, recount_comments
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает число комментариев у постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько постов проверять в одной транзакции.')
+
+    def handle(self, *args, **options):
+        fixed = recount_comments(options['batch_size'])
+        self.stdout.write(f'Исправлено постов: {fixed}')
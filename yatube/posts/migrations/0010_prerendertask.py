@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrerenderTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('group', 'Группа'), ('profile', 'Профиль')], max_length=10, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Задача пререндера',
+                'verbose_name_plural': 'Задачи пререндера',
+                'ordering': ('pk',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='prerendertask',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_prerender_task'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_prerendertask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrerenderedPage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('group', 'Группа'), ('profile', 'Профиль')], max_length=10, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('path', models.CharField(max_length=255, verbose_name='Путь')),
+            ],
+            options={
+                'verbose_name': 'Статическая страница',
+                'verbose_name_plural': 'Статические страницы',
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='prerendertask',
+            name='unique_prerender_task',
+        ),
+        migrations.AddIndex(
+            model_name='prerendertask',
+            index=models.Index(fields=['kind', 'object_id'], name='posts_prere_kind_3bc009_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='prerenderedpage',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_prerendered_page'),
+        ),
+    ]
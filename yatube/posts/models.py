@@ -2,6 +2,10 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -12,6 +16,7 @@ class Group(models.Model):
     title = models.CharField('Заголовок', max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField('Описание')
+    is_deleted = models.BooleanField('Удалена', default=False)
 
     class Meta:
         verbose_name = 'Группу'
@@ -21,11 +26,52 @@ class Group(models.Model):
         return self.title
 
 
+# Поля, которые нужны карточке поста в лентах (includes/post_descript.html).
+FEED_FIELDS = (
+    'text', 'pub_date', 'image', 'comments_count', 'likes_count',
+    'author', 'author__username', 'author__first_name', 'author__last_name',
+    'group', 'group__title', 'group__slug',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        return self.filter(is_deleted=False, author__is_active=True)
+
+    def for_feed(self):
+        """Посты для лент: автор и группа одним запросом, только поля
+        карточки."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def for_detail(self):
+        """Пост для страницы поста: автор, группа и статистика автора
+        (author_posts_count, author_followers_count) одним запросом."""
+        return self.select_related('author', 'group').annotate(
+            author_posts_count=count_by_author(Post.objects.all()),
+            author_followers_count=count_by_author(Follow.objects.all()))
+
+
+def count_by_author(queryset):
+    """Подзапрос с числом строк queryset у автора внешнего поста."""
+    return Coalesce(Subquery(
+        queryset.filter(author=OuterRef('author')).order_by()
+        .values('author').annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField()), 0)
+
+
+class PostManager(models.Manager.from_queryset(PostQuerySet)):
+    """Скрывает посты, ожидающие удаления, и посты удаляемых авторов."""
+
+    def get_queryset(self):
+        return super().get_queryset().visible()
+
+
 class Post(models.Model):
     text = models.TextField('Текст', help_text='Текст нового поста')
     pub_date = models.DateTimeField(
         'Дата публикации',
-        auto_now_add=True)
+        auto_now_add=True,
+        db_index=True)
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
@@ -42,7 +88,24 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True)
+    is_deleted = models.BooleanField('Удалена', default=False)
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев', default=0, editable=False)
+    likes_count = models.PositiveIntegerField(
+        'Число отметок «Нравится»', default=0, editable=False)
+    views_count = models.PositiveIntegerField(
+        'Число просмотров', default=0, editable=False)
+    tags = models.ManyToManyField(
+        'Tag',
+        through='PostTag',
+        related_name='posts',
+        verbose_name='Теги',
+        blank=True)
+
+    objects = PostManager()
+    all_objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
@@ -73,6 +136,7 @@ class Comment(models.Model):
     created = models.DateTimeField(
         'Дата публикации',
         auto_now_add=True,
+        db_index=True,
     )
 
     class Meta:
@@ -110,3 +174,149 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user.username} подписан на {self.author.username}'
+
+
+class Tag(models.Model):
+    name = models.CharField('Название', max_length=50, unique=True)
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return self.name
+
+
+class PostTag(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Публикация')
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Тег')
+    # Копия Post.pub_date: лента тега читается по индексу без сортировки
+    # по таблице постов.
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('post', 'tag'), name='unique_post_tag'),
+        )
+        indexes = (
+            models.Index(fields=('tag', '-pub_date', '-post')),
+        )
+        verbose_name = 'Тег публикации'
+        verbose_name_plural = 'Теги публикаций'
+
+    def __str__(self):
+        return f'{self.post} #{self.tag}'
+
+
+class Like(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пользователь')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Публикация')
+    created = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_like'),
+        )
+        verbose_name = 'Отметка «Нравится»'
+        verbose_name_plural = 'Отметки «Нравится»'
+
+    def __str__(self):
+        return f'{self.user} — {self.post}'
+
+
+class PendingDeletion(models.Model):
+    POST = 'post'
+    USER = 'user'
+    GROUP = 'group'
+    KIND_CHOICES = (
+        (POST, 'Публикация'),
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+    )
+
+    kind = models.CharField('Тип', max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField('ID объекта')
+    created = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        ordering = ('pk',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('kind', 'object_id'),
+                name='unique_pending_deletion'),
+        )
+        verbose_name = 'Отложенное удаление'
+        verbose_name_plural = 'Отложенные удаления'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id}'
+
+
+class PrerenderTask(models.Model):
+    """Страница, которую нужно заново сохранить в статический HTML."""
+    GROUP = 'group'
+    PROFILE = 'profile'
+    KIND_CHOICES = (
+        (GROUP, 'Группа'),
+        (PROFILE, 'Профиль'),
+    )
+
+    kind = models.CharField('Тип', max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField('ID объекта')
+    created = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        # Без уникальности: повтор, поставленный во время рендеринга,
+        # не сливается с задачей в работе и не теряется при её удалении.
+        ordering = ('pk',)
+        indexes = (
+            models.Index(fields=('kind', 'object_id')),
+        )
+        verbose_name = 'Задача пререндера'
+        verbose_name_plural = 'Задачи пререндера'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id}'
+
+
+class PrerenderedPage(models.Model):
+    """Путь, по которому сохранена статическая копия страницы объекта.
+
+    Нужен, чтобы после смены адреса группы или имени пользователя удалить
+    файл по старому пути.
+    """
+
+    kind = models.CharField(
+        'Тип', max_length=10, choices=PrerenderTask.KIND_CHOICES)
+    object_id = models.PositiveIntegerField('ID объекта')
+    path = models.CharField('Путь', max_length=255)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('kind', 'object_id'),
+                name='unique_prerendered_page'),
+        )
+        verbose_name = 'Статическая страница'
+        verbose_name_plural = 'Статические страницы'
+
+    def __str__(self):
+        return self.path
@@ -0,0 +1,187 @@
+"""Статические копии страниц для анонимных посетителей.
+
+Страницы «Об авторе», «Технологии», первые страницы групп и профилей
+сохраняются в PRERENDER['ROOT'] как <путь>/index.html, и веб-сервер
+может отдавать их сам посетителям без сессионной cookie. Инвалидация
+тегов кеша ставит затронутые группы и профили в очередь PrerenderTask,
+которую разбирает команда prerender_pages. Путь сохранённой страницы
+объекта записывается в PrerenderedPage: после смены адреса группы или
+имени пользователя файл по старому пути удаляется.
+"""
+import logging
+import os
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils._os import safe_join
+
+from .cache import author_tag, group_tag
+from .models import Group, PrerenderedPage, PrerenderTask
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+ABOUT_PAGES = ('about:author', 'about:tech')
+BATCH_SIZE = 100
+
+
+def get_setting(name, default=None):
+    return getattr(settings, 'PRERENDER', {}).get(name, default)
+
+
+def is_enabled():
+    return bool(get_setting('ENABLED') and get_setting('ROOT'))
+
+
+def tasks_for_tags(tags):
+    """Задачи для страниц, которые зависят от тегов."""
+    prefixes = {
+        group_tag(''): PrerenderTask.GROUP,
+        author_tag(''): PrerenderTask.PROFILE,
+    }
+    tasks = []
+    for tag in tags:
+        prefix, _, object_id = tag.rpartition(':')
+        kind = prefixes.get(prefix + ':')
+        if kind and object_id.isdigit():
+            tasks.append(PrerenderTask(kind=kind, object_id=int(object_id)))
+    return tasks
+
+
+def enqueue_tags(tags):
+    tasks = tasks_for_tags(tags)
+    if tasks:
+        PrerenderTask.objects.bulk_create(tasks)
+
+
+def file_path(path):
+    """Файл для URL: /group/slug/ -> ROOT/group/slug/index.html."""
+    return safe_join(
+        get_setting('ROOT'), unquote(path).lstrip('/'), 'index.html')
+
+
+def render_path(path):
+    """HTML страницы для анонимного посетителя или None, если её нет."""
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    request.resolver_match = match = resolve(path)
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    except Http404:
+        return None
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code != 200:
+        return None
+    return response.content
+
+
+def remove_page(path):
+    try:
+        target = file_path(path)
+    except ValueError:
+        return
+    if os.path.exists(target):
+        os.remove(target)
+
+
+def write_page(path):
+    """Сохраняет страницу или удаляет её файл, если страницы больше нет.
+    Возвращает True, если файл записан."""
+    try:
+        target = file_path(path)
+    except ValueError:
+        logger.warning('Недопустимый путь для пререндера: %s', path)
+        return False
+    content = render_path(path)
+    if content is None:
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target + '.tmp', 'wb') as output:
+        output.write(content)
+    os.replace(target + '.tmp', target)
+    return True
+
+
+def object_path(kind, object_id):
+    """Текущий адрес страницы группы или профиля; None, если объекта нет."""
+    if kind == PrerenderTask.GROUP:
+        slug = Group.objects.filter(pk=object_id).values_list(
+            'slug', flat=True).first()
+        return slug and reverse('posts:group_list', args=(slug,))
+    username = User.objects.filter(pk=object_id).values_list(
+        'username', flat=True).first()
+    return username and reverse('posts:profile', args=(username,))
+
+
+def render_object(kind, object_id, path):
+    """Сохраняет страницу объекта по path и удаляет файл, записанный
+    по прежнему пути. Возвращает True, если файл записан."""
+    page = PrerenderedPage.objects.filter(
+        kind=kind, object_id=object_id).first()
+    written = bool(path) and write_page(path)
+    if page is not None and page.path != path and not (
+            PrerenderedPage.objects.filter(path=page.path)
+            .exclude(pk=page.pk).exists()):
+        # Старый путь мог уже занять другой объект.
+        remove_page(page.path)
+    if written:
+        PrerenderedPage.objects.update_or_create(
+            kind=kind, object_id=object_id, defaults={'path': path})
+    elif page is not None:
+        page.delete()
+    return written
+
+
+def process_pending(batch_size=BATCH_SIZE):
+    """Перерисовывает страницы из очереди. Возвращает число задач.
+
+    Задачи объекта удаляются только после записи его страницы, и только
+    взятые в работу: повтор, поставленный во время рендеринга, останется
+    в очереди.
+    """
+    tasks = list(PrerenderTask.objects.values_list(
+        'pk', 'kind', 'object_id')[:batch_size])
+    latest = {(kind, object_id): pk for pk, kind, object_id in tasks}
+    for (kind, object_id), pk in latest.items():
+        render_object(kind, object_id, object_path(kind, object_id))
+        PrerenderTask.objects.filter(
+            kind=kind, object_id=object_id, pk__lte=pk).delete()
+    return len(tasks)
+
+
+def iter_objects():
+    """Группы и профили, страницы которых сохраняются, с их адресами."""
+    groups = Group.objects.filter(is_deleted=False).values_list(
+        'pk', 'slug')
+    for pk, slug in groups.iterator():
+        yield (PrerenderTask.GROUP, pk,
+               reverse('posts:group_list', args=(slug,)))
+    users = User.objects.filter(is_active=True).values_list(
+        'pk', 'username')
+    for pk, username in users.iterator():
+        yield (PrerenderTask.PROFILE, pk,
+               reverse('posts:profile', args=(username,)))
+
+
+def render_all():
+    """Сохраняет все страницы заново и удаляет страницы скрытых
+    объектов. Возвращает число записанных."""
+    written = sum(write_page(reverse(name)) for name in ABOUT_PAGES)
+    rendered = set()
+    for kind, object_id, path in iter_objects():
+        rendered.add((kind, object_id))
+        written += render_object(kind, object_id, path)
+    pages = PrerenderedPage.objects.values_list('kind', 'object_id')
+    for kind, object_id in list(pages):
+        if (kind, object_id) not in rendered:
+            render_object(kind, object_id, object_path(kind, object_id))
+    return written
@@ -0,0 +1,68 @@
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def is_available():
+    # Полнотекстовый индекс создаётся миграцией только в SQLite (FTS5).
+    return connection.vendor == 'sqlite'
+
+
+def create_index(cursor):
+    cursor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(text)')
+    cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    cursor.execute(
+        f'INSERT INTO {FTS_TABLE}(rowid, text) '
+        f'SELECT id, text FROM posts_post')
+
+
+def drop_index(cursor):
+    cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def rebuild():
+    if is_available():
+        with connection.cursor() as cursor:
+            create_index(cursor)
+
+
+def index_post(post):
+    # Индекс обновляется из сигналов, а не триггерами: SQLite пересоздаёт
+    # таблицу posts_post при изменении схемы, и триггеры бы потерялись.
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text])
+
+
+def unindex_post(post_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def match_expression(term):
+    """Каждое слово запроса — отдельная фраза FTS5, все слова обязательны."""
+    words = term.split()
+    return ' '.join('"%s"' % word.replace('"', '""') for word in words)
+
+
+def search(queryset, term):
+    expression = match_expression(term)
+    if not expression:
+        return queryset
+    if not is_available():
+        for word in term.split():
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (expression,)))
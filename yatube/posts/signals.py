@@ -0,0 +1,193 @@
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.cache_tags import tags_invalidated
+from core.middleware import get_view_name, page_cache_hit
+
+from . import lookups, prerender, search
+from .deletion import cancel_user_deletion, delete_image_files, purging
+from .cache import (author_tag, card_tags, follower_tag, group_tag,
+                    invalidate, post_tags, sitemap_tag)
+from .counters import count_view, likes, recount_commented_posts
+from .models import Comment, Follow, Group, Like, Post
+from .tags import sync_tags
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._original_group_id = instance.__dict__.get('group_id')
+
+
+def stored_image_name(post):
+    """Имя сохранённого файла картинки поста: '' — картинки нет или она
+    ещё не сохранена, None — поле не загружено из базы."""
+    if 'image' not in post.__dict__:
+        return None
+    value = post.__dict__['image']
+    if isinstance(value, FieldFile):
+        return (value.name or '') if value._committed else ''
+    if isinstance(value, File):
+        return ''
+    return value or ''
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._original_image = stored_image_name(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, **kwargs):
+    # Ссылка считается после сохранения поста, в той же транзакции:
+    # файл, загруженный для несохранившегося поста, ссылок не получает.
+    name = stored_image_name(instance)
+    original = '' if created else instance._original_image
+    instance._original_image = name
+    if name is None or original is None or name == original:
+        return
+    field = sender._meta.get_field('image')
+    if name:
+        field.storage.retain(name)
+    # Неучтённые файлы (release() вернул None) оставляем cleanup_media.
+    if original and field.storage.release(original) == 0:
+        image = field.attr_class(instance, field, original)
+        transaction.on_commit(lambda: delete_image_files(image))
+
+
+@receiver(post_save, sender=Post)
+def sync_post_tags(sender, instance, update_fields=None, **kwargs):
+    # До сброса кеша: страницы тегов не должны успеть закешироваться
+    # со старыми связями. Так теги обновляются при любом сохранении,
+    # в том числе из админки.
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    sync_tags([instance])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    tags = post_tags(instance)
+    if instance._original_group_id:
+        tags.add(group_tag(instance._original_group_id))
+    instance._original_group_id = instance.group_id
+    invalidate(*tags, rows=not kwargs.get('created'))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        Post.all_objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1)
+
+
+def is_purged_comment(comment):
+    return (comment.post_id in purging.posts
+            or comment.author_id in purging.authors)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if is_purged_comment(instance):
+        return
+    Post.all_objects.filter(
+        pk=instance.post_id, comments_count__gt=0).update(
+            comments_count=F('comments_count') - 1)
+
+
+@receiver(post_save, sender=Like)
+def count_like(sender, instance, created, **kwargs):
+    if created:
+        likes.incr(instance.post_id)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like(sender, instance, **kwargs):
+    if instance.post_id in purging.posts:
+        return
+    likes.incr(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    # Число комментариев показывается во всех карточках поста.
+    if is_purged_comment(instance):
+        return
+    try:
+        post = instance.post
+    except Post.DoesNotExist:
+        return
+    invalidate(*card_tags(post), rows=False)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    lookups.groups.invalidate()
+    invalidate(group_tag(instance.pk), sitemap_tag('groups', instance.pk),
+               rows=not kwargs.get('created'))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    invalidate(
+        author_tag(instance.author_id), follower_tag(instance.user_id))
+
+
+@receiver(post_init, sender=User)
+def remember_is_active(sender, instance, **kwargs):
+    instance._original_is_active = instance.__dict__.get('is_active')
+
+
+@receiver(post_save, sender=User)
+def update_reactivated_user(sender, instance, created, **kwargs):
+    original = instance._original_is_active
+    if not created and original is not None and (
+            instance.is_active != original):
+        recount_commented_posts([instance.pk])
+        if instance.is_active:
+            # Снова активный пользователь не должен удалиться позже.
+            cancel_user_deletion([instance.pk])
+    instance._original_is_active = instance.is_active
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    # Вход пользователя меняет только last_login, которого нет на страницах.
+    if set(kwargs.get('update_fields') or ()) == {'last_login'}:
+        return
+    lookups.authors.invalidate()
+    invalidate(author_tag(instance.pk), sitemap_tag('profiles', instance.pk),
+               rows=not kwargs.get('created'))
+
+
+@receiver(page_cache_hit)
+def count_cached_view(sender, request, **kwargs):
+    if get_view_name(request) == 'posts:post_detail':
+        count_view(request.resolver_match.kwargs['post_id'])
+
+
+@receiver(tags_invalidated)
+def queue_prerender(sender, tags, **kwargs):
+    if prerender.is_enabled():
+        prerender.enqueue_tags(tags)
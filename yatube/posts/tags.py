@@ -0,0 +1,43 @@
+import re
+from collections import defaultdict
+
+from .models import PostTag, Tag
+
+TAG_RE = re.compile(r'(?<![\w&])#(\w{1,50})(?!\w)')
+
+
+def extract_tags(text):
+    return {name.lower() for name in TAG_RE.findall(text)}
+
+
+def sync_tags(posts):
+    """Приводит теги постов к хештегам из их текста.
+
+    Меняется только разница: лишние связи удаляются, недостающие
+    добавляются. Возвращает число удалённых и добавленных связей.
+    """
+    posts = list(posts)
+    wanted = {post.pk: extract_tags(post.text) for post in posts}
+    current = defaultdict(dict)
+    for pk, post_id, name in PostTag.objects.filter(
+            post__in=wanted).values_list('pk', 'post_id', 'tag__name'):
+        current[post_id][name] = pk
+    stale = [
+        pk for post_id, names in current.items()
+        for name, pk in names.items() if name not in wanted[post_id]]
+    missing = [
+        (post, name) for post in posts
+        for name in wanted[post.pk] - current[post.pk].keys()]
+    if stale:
+        PostTag.objects.filter(pk__in=stale).delete()
+    if missing:
+        names = {name for _, name in missing}
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in names], ignore_conflicts=True)
+        tag_ids = dict(
+            Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+        PostTag.objects.bulk_create(
+            [PostTag(post=post, tag_id=tag_ids[name], pub_date=post.pub_date)
+             for post, name in missing],
+            ignore_conflicts=True)
+    return len(stale), len(missing)
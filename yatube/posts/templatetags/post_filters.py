@@ -0,0 +1,21 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from posts.tags import TAG_RE
+
+register = template.Library()
+
+
+def tag_link(match):
+    url = reverse('posts:tag_posts', args=(match.group(1).lower(),))
+    return f'<a href="{url}">#{match.group(1)}</a>'
+
+
+@register.filter(needs_autoescape=True)
+def linkify_tags(text, autoescape=True):
+    """Превращает хештеги в тексте в ссылки на ленты тегов."""
+    if autoescape:
+        text = conditional_escape(text)
+    return mark_safe(TAG_RE.sub(tag_link, text))
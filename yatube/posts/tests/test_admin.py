@@ -0,0 +1,156 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginator import EstimatedCountPaginator
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangeListTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(self.admin)
+        self.authors_count = 0
+
+    def tearDown(self):
+        cache.clear()
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.authors_count += 1
+            author = User.objects.create_user(
+                username=f'author{self.authors_count}')
+            group = Group.objects.create(
+                title=f'Группа {self.authors_count}',
+                slug=f'group-{self.authors_count}', description='-')
+            post = Post.objects.create(
+                author=author, group=group,
+                text=f'Пост номер {self.authors_count}')
+            Comment.objects.create(post=post, author=author, text='Ком')
+            Follow.objects.create(user=self.admin, author=author)
+
+    def count_queries(self, url, data=None):
+        # Сессия и пользователь каждый раз загружаются из базы.
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelist_queries_do_not_depend_on_rows(self):
+        """Число запросов списка в админке не растёт с числом строк."""
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                url = reverse(f'admin:posts_{model}_changelist')
+                self.add_rows(2)
+                few = self.count_queries(url)
+                self.add_rows(8)
+                many = self.count_queries(url)
+                self.assertEqual(few, many)
+
+    def test_group_is_not_rendered_as_full_select(self):
+        """Поле группы в списке постов — автодополнение без всех групп."""
+        self.add_rows(3)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        content = response.content.decode()
+        self.assertIn('admin-autocomplete', content)
+        # В каждой строке выбрана только её группа.
+        self.assertEqual(content.count('Группа 1<'), 1)
+
+    def test_unfiltered_changelist_uses_estimate(self):
+        """Без фильтров число постов оценивается без COUNT(*)."""
+        self.add_rows(3)
+        url = reverse('admin:posts_post_changelist')
+        with mock.patch('core.paginator.ESTIMATE_THRESHOLD', 0):
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url)
+            counts = [q['sql'] for q in context.captured_queries
+                      if 'COUNT(*)' in q['sql']
+                      and '"posts_post"' in q['sql']]
+            self.assertEqual(counts, [])
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url, {'q': 'номер'})
+            counts = [q['sql'] for q in context.captured_queries
+                      if 'COUNT(*)' in q['sql']
+                      and '"posts_post"' in q['sql']]
+            self.assertEqual(len(counts), 1)
+
+    def test_post_search_uses_fulltext_index(self):
+        """Поиск постов идёт через полнотекстовый индекс."""
+        self.add_rows(3)
+        post = Post.objects.get(text='Пост номер 2')
+        post.text = 'Совсем другой текст'
+        post.save()
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'q': 'ДРУГОЙ'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [post])
+        self.assertTrue(any(
+            'posts_post_fts' in q['sql']
+            for q in context.captured_queries))
+        response = self.client.get(url, {'q': 'номер 2'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_comment_and_follow_search_by_username(self):
+        """Комментарии и подписки ищутся по точному имени пользователя."""
+        self.add_rows(3)
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'author2'})
+        self.assertEqual(
+            [c.author.username for c in response.context['cl'].result_list],
+            ['author2'])
+        response = self.client.get(
+            reverse('admin:posts_follow_changelist'), {'q': 'author'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_comment_search_by_text(self):
+        """Комментарии ищутся и по подстроке текста, подсчёт найденного
+        ограничен."""
+        self.add_rows(2)
+        comment = Comment.objects.first()
+        comment.text = 'Вот особый комментарий'
+        comment.save()
+        with mock.patch('posts.admin.SEARCH_COUNT_LIMIT', 1):
+            response = self.client.get(
+                reverse('admin:posts_comment_changelist'),
+                {'q': 'особый комм'})
+        cl = response.context['cl']
+        self.assertEqual(list(cl.result_list), [comment])
+        self.assertEqual(cl.paginator.count_limit, 1)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def test_count_limit(self):
+        """С count_limit строки считаются не дальше предела."""
+        user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=user, text=str(i)) for i in range(5))
+        paginator = EstimatedCountPaginator(
+            Post.all_objects.filter(text__icontains=''), 2, count_limit=3)
+        self.assertEqual(paginator.count, 3)
+
+    def test_small_tables_are_counted_exactly(self):
+        """Оценка используется только для больших таблиц."""
+        user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=user, text=str(i)) for i in range(3))
+        paginator = EstimatedCountPaginator(Post.all_objects.all(), 10)
+        self.assertEqual(paginator.count, 3)
+        with mock.patch('core.paginator.ESTIMATE_THRESHOLD', 0):
+            paginator = EstimatedCountPaginator(
+                Post.all_objects.all(), 10)
+            self.assertGreaterEqual(paginator.count, 3)
+            paginator = EstimatedCountPaginator(
+                Post.all_objects.filter(text='1'), 10)
+            self.assertEqual(paginator.count, 1)
@@ -0,0 +1,145 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Test title',
+            slug='test-slug',
+            description='Test description')
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list', args=[self.group.slug]),
+            'profile': reverse('posts:profile', args=[self.user.username]),
+            'post_detail': reverse('posts:post_detail', args=[self.post.pk]),
+        }
+
+    def tearDown(self):
+        cache.clear()
+
+    def assertCached(self, url, expected='HIT'):
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], expected)
+        return response
+
+    def test_anonymous_pages_are_cached(self):
+        """Страницы для анонимных посетителей отдаются из кеша."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                first = self.assertCached(url, 'MISS')
+                second = self.assertCached(url)
+                self.assertEqual(first.content, second.content)
+
+    def test_authenticated_users_bypass_cache(self):
+        """Авторизованные пользователи не получают страницы из кеша."""
+        self.client.get(self.urls['index'])
+        response = self.authorized_client.get(self.urls['index'])
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_forms_with_csrf_token_are_not_cached(self):
+        """Страницы с CSRF-токеном не кешируются."""
+        url = reverse('users:login')
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+
+    def test_new_post_invalidates_feeds(self):
+        """Новый пост сбрасывает кеш лент и страниц постов автора."""
+        for url in self.urls.values():
+            self.client.get(url)
+        Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group)
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertCached(url, 'MISS')
+        for name in ('group_list', 'profile'):
+            with self.subTest(page=name):
+                response = self.client.get(self.urls[name])
+                self.assertContains(response, 'Новый пост')
+
+    def test_unrelated_post_keeps_cache(self):
+        """Пост другого автора без группы не сбрасывает чужие страницы."""
+        for url in self.urls.values():
+            self.client.get(url)
+        Post.objects.create(
+            author=User.objects.create_user(username='other'),
+            text='Чужой пост')
+        self.assertCached(self.urls['index'], 'MISS')
+        for name in ('group_list', 'profile', 'post_detail'):
+            with self.subTest(page=name):
+                self.assertCached(self.urls[name])
+
+    def test_comment_invalidates_post_detail(self):
+        """Новый комментарий сбрасывает кеш страницы поста."""
+        self.client.get(self.urls['post_detail'])
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий')
+        response = self.assertCached(self.urls['post_detail'], 'MISS')
+        self.assertContains(response, 'Комментарий')
+
+    def test_group_change_invalidates_group_page(self):
+        """Изменение группы сбрасывает кеш её страницы."""
+        self.client.get(self.urls['group_list'])
+        self.group.description = 'Новое описание'
+        self.group.save()
+        response = self.assertCached(self.urls['group_list'], 'MISS')
+        self.assertContains(response, 'Новое описание')
+
+    def test_moving_post_invalidates_old_group(self):
+        """Перенос поста в другую группу сбрасывает кеш прежней группы."""
+        self.client.get(self.urls['group_list'])
+        self.post.group = Group.objects.create(
+            title='Other', slug='other', description='Other')
+        self.post.save()
+        response = self.assertCached(self.urls['group_list'], 'MISS')
+        self.assertNotContains(response, self.post.text)
+
+    def test_follow_invalidates_profile(self):
+        """Новый подписчик сбрасывает кеш профиля автора."""
+        self.client.get(self.urls['profile'])
+        Follow.objects.create(
+            user=User.objects.create_user(username='follower'),
+            author=self.user)
+        self.assertCached(self.urls['profile'], 'MISS')
+
+    def test_login_keeps_profile_cached(self):
+        """Вход автора на сайт не сбрасывает кеш его профиля."""
+        self.user.set_password('pass')
+        self.user.save()
+        self.client.get(self.urls['profile'])
+        Client().login(username='auth', password='pass')
+        self.assertCached(self.urls['profile'])
+
+    def test_hit_rate_is_reported(self):
+        """Команда show_metrics показывает долю попаданий в кеш."""
+        for _ in range(4):
+            self.client.get(self.urls['index'])
+        out = StringIO()
+        call_command('show_metrics', stdout=out)
+        self.assertIn('page_cache hit rate: 75.0% (3/4)', out.getvalue())
+
+    def test_known_metrics_are_always_reported(self):
+        """Отчёт не зависит от того, какой процесс первым создал счётчик."""
+        # Счётчики, созданные другими процессами, видны только в кеше.
+        cache.set('metrics:page_cache.hit', 1)
+        cache.set('metrics:page_cache.miss', 3)
+        out = StringIO()
+        call_command('show_metrics', stdout=out)
+        self.assertIn('page_cache hit rate: 25.0% (1/4)', out.getvalue())
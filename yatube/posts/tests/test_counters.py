@@ -0,0 +1,196 @@
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Like, Post
+
+User = get_user_model()
+
+
+class CommentsCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Test title', slug='test-slug', description='Test')
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group)
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_count_follows_comments(self):
+        """Число комментариев меняется при добавлении и удалении."""
+        for i in range(2):
+            self.client.post(
+                reverse('posts:add_comment', args=(self.post.pk,)),
+                {'text': f'Комментарий {i}'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        Comment.objects.first().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_count_is_shown_in_feeds(self):
+        """Число комментариев видно в карточках лент."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Комментариев: 0')
+        self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Комментарий'})
+        # Главная страница закеширована фрагментом на 20 секунд.
+        for url in urls[1:]:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Комментариев: 1')
+
+    def test_recount_comments(self):
+        """Команда recount_comments исправляет расхождения."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=str(i))
+            for i in range(3))
+        other = Post.objects.create(author=self.user, text='Другой пост')
+        Post.objects.filter(pk=other.pk).update(comments_count=5)
+        out = StringIO()
+        call_command('recount_comments', batch_size=1, stdout=out)
+        self.assertIn('Исправлено постов: 2', out.getvalue())
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        self.assertEqual(other.comments_count, 0)
+
+
+class LikesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.client.force_login(self.user)
+        self.like_url = reverse('posts:post_like', args=(self.post.pk,))
+        self.unlike_url = reverse('posts:post_unlike', args=(self.post.pk,))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_like_is_idempotent_and_buffered(self):
+        """Повторная отметка не учитывается, число видно до записи в базу."""
+        self.client.post(self.like_url)
+        response = self.client.post(self.like_url)
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertEqual(Like.objects.count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.user.username,)))
+        self.assertContains(response, 'Нравится: 1')
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertContains(response, 'Нравится: 1')
+        self.assertContains(response, self.unlike_url)
+        call_command('flush_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.user.username,)))
+        self.assertContains(response, 'Нравится: 1')
+
+    def test_like_requires_post(self):
+        """Отметку нельзя поставить или снять GET-запросом."""
+        for url in (self.like_url, self.unlike_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        self.assertFalse(Like.objects.exists())
+
+    def test_like_button_only_for_users_who_can_like(self):
+        """Кнопка «нравится» в карточке видна только залогиненному
+        пользователю, который ещё не отметил пост."""
+        url = reverse('posts:profile', args=(self.user.username,))
+        self.assertContains(self.client.get(url), self.like_url)
+        self.client.post(self.like_url)
+        self.assertNotContains(self.client.get(url), self.like_url)
+        self.client.logout()
+        self.assertNotContains(self.client.get(url), self.like_url)
+
+    def test_unlike(self):
+        """Снятие отметки уменьшает счётчик один раз."""
+        self.client.post(self.like_url)
+        call_command('flush_counters', stdout=StringIO())
+        self.client.post(self.unlike_url)
+        self.client.post(self.unlike_url)
+        self.assertFalse(Like.objects.exists())
+        call_command('flush_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+
+class ViewsCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.views_url = reverse('posts:post_views', args=(self.post.pk,))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_views_are_counted_without_writes(self):
+        """Просмотры копятся в кеше и видны сразу, в базу — при сбросе."""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        self.assertFalse(any(
+            q['sql'].startswith('UPDATE') for q in context.captured_queries))
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Просмотров: 2')
+        self.assertEqual(self.client.get(self.views_url).json(), {'views': 2})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 0)
+        call_command('flush_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 2)
+        self.assertEqual(self.client.get(self.views_url).json(), {'views': 2})
+
+    @override_settings(PAGE_CACHE_ENABLED=True)
+    def test_cached_page_views_are_counted(self):
+        """Просмотры страницы из кеша тоже учитываются."""
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertEqual(self.client.get(self.views_url).json(), {'views': 2})
+
+    @override_settings(VIEW_COUNTER_SAMPLE_RATE=0.1)
+    def test_sampling(self):
+        """При выборочном подсчёте просмотр учитывается с весом 1 / rate."""
+        with mock.patch('posts.counters.random.random', return_value=0.5):
+            self.client.get(self.url)
+        self.assertEqual(self.client.get(self.views_url).json(), {'views': 0})
+        with mock.patch('posts.counters.random.random', return_value=0.05):
+            self.client.get(self.url)
+        self.assertEqual(
+            self.client.get(self.views_url).json(), {'views': 10})
+
+    @override_settings(VIEW_COUNTER_SAMPLE_RATE=0.3)
+    def test_sampling_rounds_weight_randomly(self):
+        """Дробный вес 1 / rate округляется случайно, без смещения."""
+        with mock.patch('posts.counters.random.random',
+                        side_effect=[0.2, 0.3, 0.2, 0.4]):
+            self.client.get(self.url)
+            self.client.get(self.url)
+        self.assertEqual(self.client.get(self.views_url).json(), {'views': 7})
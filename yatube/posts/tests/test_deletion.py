@@ -0,0 +1,188 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..deletion import (delete_in_chunks, process_pending,
+                        schedule_group_deletion, schedule_post_deletion,
+                        schedule_user_deletion)
+from ..models import Comment, Follow, Group, PendingDeletion, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+NUM_OF_POSTS = 7
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DeferredDeletionTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Test title', slug='test-slug', description='Test')
+        self.posts = [
+            Post.objects.create(
+                author=self.user, text=f'Пост {i}', group=self.group)
+            for i in range(NUM_OF_POSTS)]
+        self.post = self.posts[0]
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.reader, text=f'Ком {i}')
+            for i in range(5))
+        Follow.objects.create(user=self.reader, author=self.user)
+
+    def test_scheduled_post_is_hidden_immediately(self):
+        """Помеченный пост сразу пропадает из лент и со страницы поста."""
+        schedule_post_deletion([self.post])
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(self.post, response.context['page_obj'])
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_post_deleted_with_comments_and_image(self):
+        """Фоновая задача удаляет пост, комментарии и картинку."""
+        self.post.image = SimpleUploadedFile(
+            'small.gif', SMALL_GIF, content_type='image/gif')
+        self.post.save()
+        path = self.post.image.path
+        self.assertTrue(os.path.exists(path))
+        schedule_post_deletion([self.post])
+        call_command('process_deletions', chunk_size=2)
+        self.assertFalse(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(PendingDeletion.objects.exists())
+
+    def test_scheduled_user_is_hidden_and_deleted(self):
+        """Помеченный пользователь скрыт, а после задачи удалён целиком."""
+        schedule_user_deletion([self.user])
+        self.assertEqual(Post.objects.count(), 0)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.user.username]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        process_pending(chunk_size=3)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Post.all_objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertTrue(User.objects.filter(pk=self.reader.pk).exists())
+
+    def test_purged_comments_skip_per_row_signals(self):
+        """Комментарии удаляемого поста не пересчитывают его счётчик и не
+        сбрасывают кеш по одному."""
+        schedule_post_deletion([self.post])
+        with mock.patch('posts.signals.invalidate') as invalidate:
+            with CaptureQueriesContext(connection) as queries:
+                process_pending(chunk_size=2)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE')
+            and 'comments_count' in query['sql']])
+        self.assertEqual(invalidate.call_count, 1)
+
+    def test_comments_of_deleted_user_are_not_counted(self):
+        """Комментарии удаляемого пользователя сразу исключаются из
+        числа комментариев и не вычитаются второй раз при удалении."""
+        Comment.objects.create(post=self.post, author=self.user, text='1')
+        Comment.objects.create(post=self.post, author=self.reader, text='2')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        schedule_user_deletion([self.reader])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        process_pending()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_group_deletion_keeps_posts(self):
+        """При удалении группы посты остаются без группы."""
+        schedule_group_deletion([self.group])
+        response = self.client.get(
+            reverse('posts:group_list', args=[self.group.slug]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        process_pending(chunk_size=3)
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(
+            Post.objects.filter(group__isnull=True).count(), NUM_OF_POSTS)
+
+    def test_delete_in_chunks(self):
+        """Записи удаляются порциями заданного размера."""
+        with CaptureQueriesContext(connection) as queries:
+            deleted = delete_in_chunks(Comment.objects.all(), chunk_size=3)
+        self.assertEqual(deleted, 5)
+        deletes = [query for query in queries.captured_queries
+                   if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 2)
+
+    def test_admin_delete_only_schedules(self):
+        """Удаление пользователя в админке только помечает его."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@yatube.ru', 'password')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:auth_user_delete', args=[self.user.pk])
+        response = client.post(url, {'post': 'yes'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(PendingDeletion.objects.filter(
+            kind=PendingDeletion.USER, object_id=self.user.pk).exists())
+        self.assertEqual(Post.all_objects.count(), NUM_OF_POSTS)
+
+    def test_admin_delete_requires_related_permissions(self):
+        """Без права удалять связанные записи пользователя нельзя
+        поставить в очередь на удаление."""
+        staff = User.objects.create_user(
+            'staff', 'staff@yatube.ru', 'password', is_staff=True)
+        staff.user_permissions.add(
+            Permission.objects.get(codename='delete_user'),
+            Permission.objects.get(codename='view_user'))
+        client = Client()
+        client.force_login(staff)
+        url = reverse('admin:auth_user_delete', args=[self.user.pk])
+        response = client.get(url)
+        self.assertIn('Публикацию', response.context['perms_lacking'])
+        response = client.post(url, {'post': 'yes'})
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.assertFalse(PendingDeletion.objects.exists())
+
+    def test_reactivated_user_is_not_deleted(self):
+        """Повторная активация пользователя отменяет его удаление."""
+        schedule_user_deletion([self.user])
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = True
+        user.save()
+        self.assertFalse(PendingDeletion.objects.exists())
+        process_pending()
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(Post.objects.count(), NUM_OF_POSTS)
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..deletion import schedule_post_deletion
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Test title', slug='test-slug', description='Test')
+        self.post = Post.objects.create(
+            author=self.user, text='Первый пост', group=self.group)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_feeds(self):
+        """RSS и Atom есть для главной, группы и автора."""
+        urls = (
+            reverse('posts:index_feed', args=('rss',)),
+            reverse('posts:index_feed', args=('atom',)),
+            reverse('posts:group_feed', args=(self.group.slug, 'rss')),
+            reverse('posts:author_feed', args=(self.user.username, 'atom')),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('xml', response['Content-Type'])
+                self.assertContains(response, 'Первый пост')
+        response = self.client.get(
+            reverse('posts:group_feed', args=('missing', 'rss')))
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_reads_only_new_posts(self):
+        """Новые посты дочитываются в закешированную ленту по pk."""
+        url = reverse('posts:index_feed', args=('rss',))
+        self.client.get(url)
+        new_post = Post.objects.create(author=self.user, text='Второй пост')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertContains(response, 'Первый пост')
+        self.assertContains(response, 'Второй пост')
+        post_queries = [q['sql'] for q in context.captured_queries
+                        if 'FROM "posts_post"' in q['sql']]
+        self.assertEqual(len(post_queries), 1)
+        self.assertIn(f'"posts_post"."id" > {self.post.pk}', post_queries[0])
+        self.assertNotIn('OFFSET', post_queries[0])
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        self.assertIn(
+            f'"posts_post"."id" > {new_post.pk}',
+            context.captured_queries[-1]['sql'])
+
+    def test_feed_is_rebuilt_after_edit(self):
+        """Изменение поста сбрасывает закешированную ленту."""
+        url = reverse('posts:group_feed', args=(self.group.slug, 'rss'))
+        self.client.get(url)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Исправленный пост')
+        self.assertNotContains(response, 'Первый пост')
+
+    def test_sitemap(self):
+        """Индекс карты сайта ссылается на файлы разделов."""
+        response = self.client.get(reverse('posts:sitemap_index'))
+        for section in ('posts', 'groups', 'profiles'):
+            self.assertContains(
+                response, reverse('posts:sitemap', args=(section, 0)))
+        url = reverse('posts:sitemap', args=('posts', 0))
+        response = self.client.get(url)
+        self.assertContains(
+            response, reverse('posts:post_detail', args=(self.post.pk,)))
+        new_post = Post.objects.create(author=self.user, text='Второй пост')
+        response = self.client.get(url)
+        self.assertContains(
+            response, reverse('posts:post_detail', args=(new_post.pk,)))
+        schedule_post_deletion([self.post])
+        response = self.client.get(url)
+        self.assertNotContains(
+            response, reverse('posts:post_detail', args=(self.post.pk,)))
+        response = self.client.get(
+            reverse('posts:sitemap', args=('missing', 0)))
+        self.assertEqual(response.status_code, 404)
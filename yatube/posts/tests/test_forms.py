@@ -1,6 +1,9 @@
 import shutil
+import struct
 import tempfile
+import zlib
 from http import HTTPStatus
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -13,6 +16,21 @@ from ..models import Comment, Group, Post
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
+def png_chunk(kind, data):
+    crc = zlib.crc32(kind + data) & 0xffffffff
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', crc)
+
+
+def png_header(width, height):
+    """PNG с заданными размерами в заголовке и без настоящих пикселей."""
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + png_chunk(b'IHDR', header)
+        + png_chunk(b'IDAT', zlib.compress(b''))
+        + png_chunk(b'IEND', b''))
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostsTestCase(TestCase):
     def setUp(self):
@@ -183,3 +201,45 @@ class PostsTestCase(TestCase):
         self.assertEqual(post.image.read(), self.small_gif)
         self.assertRedirects(
             response, reverse('posts:profile', args=[self.user.username]))
+
+    def test_oversized_image_rejected_by_header(self):
+        """Картинка с огромными размерами отклоняется без декодирования."""
+        initial_post_count = Post.objects.count()
+        for width, height in ((9000, 10), (6000, 6000)):
+            with self.subTest(size=(width, height)), mock.patch(
+                    'PIL.ImageFile.ImageFile.load',
+                    side_effect=AssertionError('Картинка декодирована')):
+                response = self.authorized_client.post(
+                    reverse('posts:post_create'), {
+                        'text': 'Огромная картинка',
+                        'image': SimpleUploadedFile(
+                            'huge.png', png_header(width, height),
+                            content_type='image/png'),
+                    })
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(response.context['form'].errors['image'])
+        self.assertEqual(Post.objects.count(), initial_post_count)
+
+    def test_unsupported_image_format_rejected(self):
+        """Картинки в форматах не из IMAGE_UPLOAD['FORMATS'] отклоняются."""
+        with override_settings(IMAGE_UPLOAD={'FORMATS': ('PNG',)}):
+            response = self.authorized_client.post(
+                reverse('posts:post_create'),
+                {'text': 'Гифка', 'image': self.uploaded})
+        self.assertEqual(
+            response.context['form'].errors['image'][0],
+            'Неподдерживаемый формат картинки.')
+
+    @override_settings(UPLOAD_MAX_SIZE=1024)
+    def test_upload_size_limit(self):
+        """Запрос с файлами больше UPLOAD_MAX_SIZE отклоняется."""
+        initial_post_count = Post.objects.count()
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), {
+                'text': 'Большой файл',
+                'image': SimpleUploadedFile(
+                    'big.gif', self.small_gif + b'\0' * 2048,
+                    content_type='image/gif'),
+            })
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(Post.objects.count(), initial_post_count)
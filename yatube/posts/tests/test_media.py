@@ -0,0 +1,159 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import StoredFile
+
+from ..deletion import delete_post
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.storage = Post._meta.get_field('image').storage
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.user, text='Текст',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'))
+
+    def test_same_image_stored_once(self):
+        """Одинаковые картинки сохраняются в один файл."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertTrue(first.image.name.endswith('.gif'))
+        self.assertEqual(self.storage.references(first.image.name), 2)
+
+    def test_shared_image_deleted_with_last_post(self):
+        """Файл удаляется только вместе с последним ссылающимся постом."""
+        first = self.create_post()
+        second = self.create_post()
+        path = first.image.path
+        delete_post(first.pk)
+        self.assertTrue(os.path.exists(path))
+        delete_post(second.pk)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.storage.references(second.image.name), 0)
+
+    def test_replaced_and_cleared_images_are_released(self):
+        """Замена и удаление картинки поста снимают ссылку на старый
+        файл."""
+        post = self.create_post()
+        old_name = post.image.name
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Текст', 'image': SimpleUploadedFile(
+                'other.gif', SMALL_GIF + b'\0', 'image/gif')})
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertEqual(self.storage.references(old_name), 0)
+        self.assertEqual(self.storage.references(post.image.name), 1)
+        new_name = post.image.name
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Текст', 'image-clear': 'on'})
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertEqual(self.storage.references(new_name), 0)
+
+    def test_unsaved_upload_is_not_referenced(self):
+        """Файл, сохранённый без поста, не получает ссылку."""
+        name = self.storage.save(
+            'posts/small.gif', ContentFile(SMALL_GIF, 'small.gif'))
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.references(name), 0)
+
+    def test_dedupe_media(self):
+        """Команда переносит старые картинки на имена из хеша."""
+        names = [
+            self.storage._save(f'posts/old{i}.gif', ContentFile(SMALL_GIF))
+            for i in range(2)]
+        posts = Post.objects.bulk_create(
+            Post(author=self.user, text='Текст', image=name)
+            for name in names)
+        call_command('dedupe_media', dry_run=True)
+        self.assertTrue(all(self.storage.exists(name) for name in names))
+        call_command('dedupe_media', batch_size=1)
+        images = {post.image.name for post in Post.objects.all()}
+        self.assertEqual(len(images), 1)
+        image = images.pop()
+        self.assertEqual(len(posts), self.storage.references(image))
+        self.assertTrue(self.storage.exists(image))
+        self.assertFalse(any(self.storage.exists(name) for name in names))
+        self.assertEqual(
+            StoredFile.objects.get(name=image).refcount, len(posts))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CleanupMediaTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.storage = Post._meta.get_field('image').storage
+        self.post = Post.objects.create(
+            author=self.user, text='Текст',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'))
+        self.orphan = self.storage._save(
+            'posts/orphan.gif', ContentFile(SMALL_GIF + b'\0'))
+        self.fresh = self.storage._save(
+            'posts/fresh.gif', ContentFile(SMALL_GIF + b'\1'))
+        old = time.time() - 2 * 24 * 60 * 60
+        for name in (self.post.image.name, self.orphan):
+            os.utime(self.storage.path(name), (old, old))
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_dry_run_keeps_files(self):
+        """В режиме --dry-run файлы не удаляются."""
+        call_command('cleanup_media', dry_run=True, stdout=StringIO())
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    def test_old_orphans_deleted(self):
+        """Удаляются только старые файлы, на которые нет ссылок."""
+        call_command('cleanup_media', batch_size=1, stdout=StringIO())
+        self.assertFalse(self.storage.exists(self.orphan))
+        self.assertTrue(self.storage.exists(self.fresh))
+        self.assertTrue(self.storage.exists(self.post.image.name))
+
+    def test_refcounts_synced(self):
+        """Счётчики ссылок StoredFile сверяются с постами."""
+        StoredFile.objects.filter(name=self.post.image.name).update(
+            refcount=5)
+        call_command('cleanup_media', stdout=StringIO())
+        self.assertEqual(
+            self.storage.references(self.post.image.name), 1)
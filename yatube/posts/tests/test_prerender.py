@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..deletion import schedule_group_deletion
+from ..models import (Comment, Group, Post, PrerenderedPage,
+                      PrerenderTask)
+
+User = get_user_model()
+
+PRERENDER_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(PRERENDER={'ENABLED': True, 'ROOT': PRERENDER_ROOT})
+class PrerenderTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.reader = User.objects.create_user(username='reader')
+        PrerenderTask.objects.all().delete()
+
+    def tearDown(self):
+        shutil.rmtree(PRERENDER_ROOT, ignore_errors=True)
+
+    def page(self, *parts):
+        return os.path.join(PRERENDER_ROOT, *parts, 'index.html')
+
+    def read(self, *parts):
+        with open(self.page(*parts), encoding='utf-8') as page:
+            return page.read()
+
+    def prerender(self, *args):
+        call_command('prerender_pages', *args, stdout=StringIO())
+
+    def test_post_queues_group_and_profile(self):
+        """Новый пост перерисовывает только страницы своей группы
+        и своего автора."""
+        Post.objects.create(
+            author=self.user, group=self.group, text='Статический пост')
+        self.assertEqual(
+            set(PrerenderTask.objects.values_list('kind', 'object_id')),
+            {(PrerenderTask.GROUP, self.group.pk),
+             (PrerenderTask.PROFILE, self.user.pk)})
+        self.prerender()
+        self.assertFalse(PrerenderTask.objects.exists())
+        self.assertIn('Статический пост', self.read('group', 'group'))
+        self.assertIn('Статический пост', self.read('profile', 'auth'))
+        self.assertFalse(os.path.exists(self.page('profile', 'reader')))
+
+    def test_comment_refreshes_pages(self):
+        """Комментарий обновляет счётчик на страницах с карточкой поста."""
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='Пост')
+        self.prerender()
+        Comment.objects.create(post=post, author=self.reader, text='Ком')
+        self.prerender()
+        self.assertIn('Комментариев: 1', self.read('group', 'group'))
+
+    def test_deleted_group_page_removed(self):
+        """Страница удалённой группы пропадает из статических файлов."""
+        self.prerender('--all')
+        self.assertTrue(os.path.exists(self.page('group', 'group')))
+        schedule_group_deletion([self.group])
+        self.prerender()
+        self.assertFalse(os.path.exists(self.page('group', 'group')))
+
+    def test_renamed_group_and_user_pages_moved(self):
+        """После смены адреса группы и имени пользователя файлы по старым
+        путям удаляются."""
+        self.prerender('--all')
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.user.username = 'author'
+        self.user.save()
+        self.prerender()
+        self.assertFalse(os.path.exists(self.page('group', 'group')))
+        self.assertTrue(os.path.exists(self.page('group', 'renamed')))
+        self.assertFalse(os.path.exists(self.page('profile', 'auth')))
+        self.assertTrue(os.path.exists(self.page('profile', 'author')))
+        self.assertEqual(
+            PrerenderedPage.objects.get(object_id=self.group.pk,
+                                        kind=PrerenderTask.GROUP).path,
+            '/group/renamed/')
+
+    def test_task_kept_until_page_written(self):
+        """Задача удаляется только после записи страницы, а повтор,
+        поставленный во время рендеринга, остаётся в очереди."""
+        Post.objects.create(author=self.user, text='Пост')
+        with mock.patch('posts.prerender.write_page',
+                        side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.prerender()
+        self.assertTrue(PrerenderTask.objects.exists())
+
+        def requeue(path):
+            PrerenderTask.objects.create(
+                kind=PrerenderTask.PROFILE, object_id=self.user.pk)
+            return False
+
+        PrerenderTask.objects.exclude(
+            kind=PrerenderTask.PROFILE).delete()
+        with mock.patch('posts.prerender.write_page', side_effect=requeue):
+            self.prerender()
+        self.assertEqual(PrerenderTask.objects.count(), 1)
+
+    def test_render_all(self):
+        """--all сохраняет страницы «Об авторе», групп и профилей."""
+        self.prerender('--all')
+        for parts in (('about', 'author'), ('about', 'tech'),
+                      ('group', 'group'), ('profile', 'auth'),
+                      ('profile', 'reader')):
+            self.assertTrue(os.path.exists(self.page(*parts)), parts)
+        self.assertNotIn('csrfmiddlewaretoken', self.read('about', 'tech'))
+
+    @override_settings(PRERENDER={'ENABLED': False})
+    def test_disabled(self):
+        """Без PRERENDER['ENABLED'] очередь не пополняется."""
+        Post.objects.create(author=self.user, text='Пост')
+        self.assertFalse(PrerenderTask.objects.exists())
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, PostTag, Tag
+from ..tags import extract_tags
+
+User = get_user_model()
+
+
+class TagsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_extract_tags(self):
+        """Хештеги выделяются из текста без учёта регистра."""
+        self.assertEqual(
+            extract_tags('#Django и #питон, но не a#b и не &#39;'),
+            {'django', 'питон'})
+
+    def test_tags_are_synced_on_create_and_edit(self):
+        """При правке меняется только разница в тегах."""
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост #один #два'})
+        post = Post.objects.get()
+        self.assertEqual(
+            set(post.tags.values_list('name', flat=True)), {'один', 'два'})
+        kept = PostTag.objects.get(post=post, tag__name='один')
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Пост #один #три'})
+        self.assertEqual(
+            set(post.tags.values_list('name', flat=True)), {'один', 'три'})
+        self.assertTrue(PostTag.objects.filter(pk=kept.pk).exists())
+        self.assertEqual(Tag.objects.count(), 3)
+
+    def test_tags_are_synced_on_admin_edit(self):
+        """Правка поста в админке обновляет теги и страницу тега."""
+        post = Post.objects.create(author=self.user, text='Пост #старый')
+        url = reverse('posts:tag_posts', args=('новый',))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        admin = User.objects.create_superuser(
+            'admin', 'admin@yatube.ru', 'password')
+        self.client.force_login(admin)
+        self.client.post(
+            reverse('admin:posts_post_change', args=(post.pk,)),
+            {'text': 'Пост #новый', 'author': self.user.pk})
+        self.assertEqual(
+            list(post.tags.values_list('name', flat=True)), ['новый'])
+        self.assertEqual(self.client.get(url).context['posts'], [post])
+
+    def test_tag_feed_uses_keyset_pagination(self):
+        """Лента тега листается курсором по дате и pk."""
+        posts = [Post.objects.create(author=self.user, text=f'#тег {i}')
+                 for i in range(12)]
+        Post.objects.create(author=self.user, text='без тега')
+        call_command('backfill_tags', batch_size=5, stdout=StringIO())
+        url = reverse('posts:tag_posts', args=('ТЕГ',))
+        response = self.client.get(url)
+        first_page = response.context['posts']
+        self.assertEqual(len(first_page), 10)
+        self.assertEqual(first_page[0], posts[-1])
+        cursor = response.context['next_cursor']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'after': cursor})
+        self.assertEqual(response.context['posts'], posts[1::-1])
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertFalse(any(
+            'OFFSET' in q['sql'] for q in context.captured_queries))
+        response = self.client.get(url, {'after': 'мусор'})
+        self.assertEqual(len(response.context['posts']), 10)
+
+    def test_backfill_is_idempotent(self):
+        """Повторный разбор не меняет связи."""
+        # bulk_create обходит сигналы, как загрузка данных до появления
+        # тегов.
+        Post.objects.bulk_create([Post(author=self.user, text='#а #б')])
+        out = StringIO()
+        call_command('backfill_tags', stdout=out)
+        self.assertIn('Добавлено связей: 2', out.getvalue())
+        out = StringIO()
+        call_command('backfill_tags', stdout=out)
+        self.assertIn('Добавлено связей: 0, удалено связей: 0', out.getvalue())
+
+    def test_hashtags_are_links(self):
+        """Хештеги в тексте поста — ссылки на ленту тега."""
+        post = Post.objects.create(author=self.user, text='Про #django')
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        self.assertContains(
+            response,
+            f'<a href="{reverse("posts:tag_posts", args=("django",))}">'
+            '#django</a>')
@@ -7,10 +7,14 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse, reverse_lazy
 from posts.forms import CommentForm, PostForm
 
+from .. import lookups
+from ..deletion import schedule_group_deletion
 from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
@@ -72,6 +76,7 @@ class ViewsTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -247,6 +252,9 @@ class ViewsTests(TestCase):
 
 class PaginatorTestCase(TestCase):
     def setUp(cls):
+        # Посты создаются через bulk_create без сигналов, поэтому
+        # закешированное число постов из других тестов нужно сбросить.
+        cache.clear()
         cls.user = User.objects.create_user(username='auth')
         cls.follower = User.objects.create_user(username='testfollower')
         cls.group = Group.objects.create(
@@ -314,3 +322,182 @@ class PaginatorTestCase(TestCase):
         response = self.client.get(reverse('posts:follow_index') + '?page=2')
         self.assertEqual(
             len(response.context['page_obj']), NUM_OF_POSTS_2PAGE)
+
+
+class CachedCountTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.follower = User.objects.create_user(username='follower')
+        self.client.force_login(self.follower)
+        for i in range(NUM_OF_POSTS):
+            Post.objects.create(text=f'Test post {i}', author=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        count_queries = [q for q in context.captured_queries
+                         if 'COUNT(*)' in q['sql']
+                         and 'FROM "posts_post"' in q['sql']]
+        return response, count_queries
+
+    def test_count_is_cached_until_post_created(self):
+        """Число постов берётся из кеша до создания нового поста."""
+        url = reverse('posts:profile', args=('auth',))
+        response, queries = self.get_count_queries(url)
+        self.assertEqual(len(queries), 1)
+        response, queries = self.get_count_queries(url)
+        self.assertEqual(queries, [])
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, NUM_OF_POSTS)
+        Post.objects.create(text='Новый пост', author=self.user)
+        response, queries = self.get_count_queries(url)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, NUM_OF_POSTS + 1)
+
+    def test_follow_count_is_reset_on_follow(self):
+        """Подписка сбрасывает число постов в ленте подписчика."""
+        url = reverse('posts:follow_index')
+        response, queries = self.get_count_queries(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+        Follow.objects.create(user=self.follower, author=self.user)
+        response, queries = self.get_count_queries(url)
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, NUM_OF_POSTS)
+
+
+class FeedQueriesTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.client.force_login(self.reader)
+        self.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)]
+        self.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}')
+            for i in range(3)]
+        for author in self.authors:
+            Follow.objects.create(user=self.reader, author=author)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:follow_index'),
+            reverse('posts:group_list', args=('group-0',)),
+            reverse('posts:profile', args=('author0',)),
+            reverse('posts:tag_posts', args=('лента',)),
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def create_posts(self, count):
+        for i in range(count):
+            Post.objects.create(
+                text=f'Пост {i} #лента', author=self.authors[i % 3],
+                group=self.groups[i % 3])
+
+    def count_queries(self):
+        counts = {}
+        for url in self.urls:
+            cache.clear()
+            lookups.groups.invalidate()
+            lookups.authors.invalidate()
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url)
+            counts[url] = len(context.captured_queries)
+        return counts
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Число запросов лент не зависит от числа постов на странице."""
+        self.create_posts(1)
+        single = self.count_queries()
+        self.create_posts(EXPENDED_NUM_OF_POSTS)
+        self.assertEqual(self.count_queries(), single)
+
+
+class PostDetailQueriesTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        Post.objects.create(text='Ещё пост', author=self.author)
+        self.readers = [
+            User.objects.create_user(username=f'reader{i}') for i in range(5)]
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+            Comment.objects.create(
+                post=self.post, author=reader, text=f'От {reader}')
+        self.client.force_login(self.readers[0])
+        self.url = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_post_detail_query_budget(self):
+        """Страница поста укладывается в постоянное число запросов:
+        сессия, пользователь, пост со статистикой автора, комментарии
+        и отметка «Нравится»."""
+        cache.clear()
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        post = response.context['post']
+        self.assertEqual(post.author_posts_count, 2)
+        self.assertEqual(post.author_followers_count, len(self.readers))
+        self.assertEqual(
+            len(response.context['comments']), len(self.readers))
+        self.assertContains(response, 'reader4')
+
+
+class LookupCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='group')
+
+    def tearDown(self):
+        cache.clear()
+
+    def lookup_queries(self, url, table):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return [query for query in context.captured_queries
+                if f'FROM "{table}" WHERE' in query['sql']]
+
+    def test_group_and_author_lookups_are_cached(self):
+        """Группа и автор ищутся в базе только при первом запросе."""
+        for url, table in (
+                (reverse('posts:group_list', args=('group',)), 'posts_group'),
+                (reverse('posts:profile', args=('auth',)), 'auth_user')):
+            with self.subTest(url=url):
+                self.assertEqual(len(self.lookup_queries(url, table)), 1)
+                cache.clear()
+                self.assertEqual(self.lookup_queries(url, table), [])
+
+    def test_author_lookup_caches_fields_only(self):
+        """В кеше поиска автора нет хеша пароля, а каждый поиск отдаёт
+        новый объект."""
+        first = lookups.get_author_or_404('auth')
+        second = lookups.get_author_or_404('auth')
+        self.assertIsNot(first, second)
+        self.assertEqual(first, second)
+        self.assertEqual(first.username, 'auth')
+        self.assertIn('password', first.get_deferred_fields())
+        self.assertNotIn(
+            first.password, lookups.authors.get_or_load('auth', list))
+
+    def test_lookups_reset_on_change(self):
+        """Изменение и удаление группы сбрасывают кеш поиска."""
+        url = reverse('posts:group_list', args=('group',))
+        self.client.get(url)
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(self.client.get(url), 'Новое название')
+        schedule_group_deletion([self.group])
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.NOT_FOUND)
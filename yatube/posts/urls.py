@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 
 from . import views
 
@@ -7,12 +7,17 @@ app_name = 'posts'
 urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('', views.index, name='index'),
+    path('tag/<str:name>/', views.tag_posts, name='tag_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
+    path('posts/<int:post_id>/views/', views.post_views, name='post_views'),
+    path('posts/<int:post_id>/like/', views.post_like, name='post_like'),
+    path('posts/<int:post_id>/unlike/',
+         views.post_unlike, name='post_unlike'),
     path('follow/', views.follow_index, name='follow_index'),
     path('profile/<str:username>/follow/',
          views.profile_follow,
@@ -22,4 +27,13 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    re_path(r'^(?P<feed_type>rss|atom)/$',
+            views.index_feed, name='index_feed'),
+    re_path(r'^group/(?P<slug>[-\w]+)/(?P<feed_type>rss|atom)/$',
+            views.group_feed, name='group_feed'),
+    re_path(r'^profile/(?P<username>[^/]+)/(?P<feed_type>rss|atom)/$',
+            views.author_feed, name='author_feed'),
+    path('sitemap.xml', views.sitemap_index, name='sitemap_index'),
+    path('sitemap-<slug:section>-<int:chunk>.xml',
+         views.sitemap, name='sitemap'),
 ]
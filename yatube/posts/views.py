@@ -1,43 +1,79 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 
+from core.cache_tags import tag_response
+from core.paginator import (CachedCountPaginator, KnownCountPaginator,
+                            decode_cursor, encode_cursor)
+
+from . import feeds
+from .cache import (FEED_TAG, author_tag, follower_tag, group_tag,
+                    page_tags, post_tag, sitemap_chunk_tag)
+from .counters import attach_likes, count_view, likes, views
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .lookups import get_author_or_404, get_group_or_404
+from .models import FEED_FIELDS, Follow, Like, Post, PostTag, Tag
 
 AMOUNT_OF_ELEMENTS = 10
+# Число постов сбрасывается по тегам, а срок жизни страхует от случаев
+# без инвалидации (например, деактивации автора). Лента подписок зависит
+# от многих авторов, поэтому её число живёт меньше.
+COUNT_TIMEOUT = 300
+FOLLOW_COUNT_TIMEOUT = 60
+COMMENTS_PER_PAGE = 20
 
 
-def paginator(request, posts):
-    paginator = Paginator(posts, AMOUNT_OF_ELEMENTS)
+def paginator(request, posts, count_key=None, count_tags=(),
+              count_timeout=None):
+    paginator = CachedCountPaginator(
+        posts, AMOUNT_OF_ELEMENTS, cache_key=count_key, tags=count_tags,
+        timeout=count_timeout or COUNT_TIMEOUT)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+def posts_page(request, posts, **kwargs):
+    page_obj = paginator(request, posts, **kwargs)
+    page_obj.object_list = attach_likes(page_obj.object_list, request.user)
+    return page_obj
+
+
 def index(request):
-    posts = Post.objects.select_related('group', 'author')
-    page_obj = paginator(request=request, posts=posts)
+    posts = Post.objects.for_feed()
+    page_obj = posts_page(
+        request=request, posts=posts,
+        count_key='index', count_tags=(FEED_TAG,))
     context = {
         'page_obj': page_obj,
     }
-    return render(request, 'posts/index.html', context)
+    response = render(request, 'posts/index.html', context)
+    return tag_response(response, FEED_TAG, *page_tags(page_obj))
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = paginator(request=request, posts=posts)
+    group = get_group_or_404(slug)
+    posts = group.posts.for_feed()
+    page_obj = posts_page(
+        request=request, posts=posts,
+        count_key=f'group:{group.pk}', count_tags=(group_tag(group.pk),))
     context = {
         'page_obj': page_obj,
         'group': group,
     }
-    return render(request, 'posts/group_list.html', context)
+    response = render(request, 'posts/group_list.html', context)
+    return tag_response(response, group_tag(group.pk), *page_tags(page_obj))
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group')
-    page_obj = paginator(request=request, posts=posts)
+    author = get_author_or_404(username)
+    posts = author.posts.for_feed()
+    page_obj = posts_page(
+        request=request, posts=posts,
+        count_key=f'author:{author.pk}',
+        count_tags=(author_tag(author.pk),))
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author).exists()
     context = {
@@ -45,19 +81,62 @@ def profile(request, username):
         'page_obj': page_obj,
         'following': following,
     }
-    return render(request, 'posts/profile.html', context)
+    response = render(request, 'posts/profile.html', context)
+    return tag_response(
+        response, author_tag(author.pk), *page_tags(page_obj))
+
+
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    entries = PostTag.objects.filter(
+        tag=tag, post__is_deleted=False, post__author__is_active=True,
+    ).select_related('post__author', 'post__group').only(
+        'pub_date', 'post', *(f'post__{field}' for field in FEED_FIELDS),
+    ).order_by('-pub_date', '-post_id')
+    cursor = decode_cursor(request.GET.get('after'))
+    if cursor:
+        pub_date, post_id = cursor
+        entries = entries.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, post_id__lt=post_id))
+    entries = list(entries[:AMOUNT_OF_ELEMENTS + 1])
+    posts = attach_likes(
+        (entry.post for entry in entries[:AMOUNT_OF_ELEMENTS]), request.user)
+    next_cursor = None
+    if len(entries) > AMOUNT_OF_ELEMENTS:
+        last = entries[AMOUNT_OF_ELEMENTS - 1]
+        next_cursor = encode_cursor(last.pub_date, last.post_id)
+    context = {
+        'tag': tag,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    response = render(request, 'posts/tag_list.html', context)
+    return tag_response(response, FEED_TAG, *page_tags(posts))
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.select_related('post')
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    # Число страниц берётся из счётчика на посте, без COUNT(*).
+    comments = KnownCountPaginator(
+        post.comments.filter(author__is_active=True).select_related('author'),
+        COMMENTS_PER_PAGE, count=post.comments_count,
+    ).get_page(request.GET.get('page'))
     form = CommentForm()
+    count_view(post.pk)
+    post.likes_total = likes.total(post)
+    post.views_total = views.total(post)
+    is_liked = request.user.is_authenticated and Like.objects.filter(
+        user=request.user, post=post).exists()
     context = {
         'post': post,
+        'is_liked': is_liked,
         'comments': comments,
         'form': form,
     }
-    return render(request, 'posts/post_detail.html', context)
+    response = render(request, 'posts/post_detail.html', context)
+    return tag_response(
+        response, post_tag(post.pk), *page_tags([post]))
 
 
 @login_required
@@ -104,10 +183,35 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def post_views(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    return JsonResponse({'views': views.total(post)})
+
+
+@require_POST
+@login_required
+def post_like(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    Like.objects.get_or_create(user=request.user, post=post)
+    return redirect('posts:post_detail', post_id)
+
+
+@require_POST
+@login_required
+def post_unlike(request, post_id):
+    Like.objects.filter(user=request.user, post_id=post_id).delete()
+    return redirect('posts:post_detail', post_id)
+
+
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(request=request, posts=posts)
+    posts = Post.objects.for_feed().filter(
+        author__following__user=request.user)
+    page_obj = posts_page(
+        request=request, posts=posts,
+        count_key=f'follow:{request.user.pk}',
+        count_tags=(FEED_TAG, follower_tag(request.user.pk)),
+        count_timeout=FOLLOW_COUNT_TIMEOUT)
     context = {
         'page_obj': page_obj,
     }
@@ -116,7 +220,7 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username)
     if request.user != author:
         Follow.objects.get_or_create(author=author, user=request.user)
     return redirect('posts:profile', username)
@@ -124,6 +228,61 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username)
     Follow.objects.filter(author=author, user=request.user).delete()
     return redirect('posts:profile', username)
+
+
+def feed_response(request, feed, *tags):
+    response = HttpResponse(content_type=feed.content_type)
+    feed.write(response, 'utf-8')
+    return tag_response(response, *tags)
+
+
+def index_feed(request, feed_type):
+    feed = feeds.render_feed(
+        request, feed_type, 'Yatube', reverse('posts:index'),
+        'Последние публикации', feeds.index_items())
+    return feed_response(request, feed, FEED_TAG)
+
+
+def group_feed(request, slug, feed_type):
+    group = get_group_or_404(slug)
+    feed = feeds.render_feed(
+        request, feed_type, group.title,
+        reverse('posts:group_list', args=(slug,)), group.description,
+        feeds.group_items(group))
+    return feed_response(request, feed, group_tag(group.pk))
+
+
+def author_feed(request, username, feed_type):
+    author = get_author_or_404(username)
+    feed = feeds.render_feed(
+        request, feed_type, author.get_full_name() or author.username,
+        reverse('posts:profile', args=(username,)),
+        f'Публикации {author.username}', feeds.author_items(author))
+    return feed_response(request, feed, author_tag(author.pk))
+
+
+def sitemap_index(request):
+    sitemaps = [
+        request.build_absolute_uri(
+            reverse('posts:sitemap', args=(section, chunk)))
+        for section, chunks in feeds.sitemap_chunks().items()
+        for chunk in chunks]
+    response = render(
+        request, 'posts/sitemap_index.xml', {'sitemaps': sitemaps},
+        content_type='application/xml')
+    return tag_response(response, FEED_TAG)
+
+
+def sitemap(request, section, chunk):
+    if section not in feeds.SITEMAP_SECTIONS:
+        raise Http404
+    urls = [
+        (request.build_absolute_uri(location), lastmod)
+        for location, lastmod in feeds.sitemap_urls(section, chunk)]
+    response = render(
+        request, 'posts/sitemap.xml', {'urls': urls},
+        content_type='application/xml')
+    return tag_response(response, sitemap_chunk_tag(section, chunk))
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from posts.admin import DeferredDeletionMixin
+from posts.deletion import schedule_user_deletion
+
+User = get_user_model()
+
+
+class YatubeUserAdmin(DeferredDeletionMixin, UserAdmin):
+    schedule_deletion = staticmethod(schedule_user_deletion)
+
+
+admin.site.unregister(User)
+admin.site.register(User, YatubeUserAdmin)
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'notifications.apps.NotificationsConfig',
     'about.apps.AboutConfig',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -50,11 +51,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.TemplateProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.PageCacheMiddleware',
+    'core.middleware.EdgeCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CachedAuthenticationMiddleware',
+    'core.middleware.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,6 +88,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Import every URLconf and compile the site templates when yatube/wsgi.py is
+# loaded, before the worker takes requests (see core.warmup).
+WSGI_WARMUP = not DEBUG
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -133,6 +144,23 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# `collectstatic` writes fingerprinted files plus .gz/.br siblings here;
+# core.middleware.StaticFilesMiddleware serves them with far-future headers.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+if not DEBUG:
+    STATICFILES_STORAGE = (
+        'core.storage.CompressedManifestStaticFilesStorage')
+
+
+# Sessions are written through to the database and read from the cache;
+# core.middleware.CachedAuthenticationMiddleware caches the logged-in user
+# too, so requests with a session cookie usually skip both queries. Both
+# rely on the shared cache configured below (see core.checks); the cached
+# user never contains the password hash.
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 
 # Login and logout pages
 
@@ -141,11 +169,20 @@ LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
 
-# Saving emails to files
+# Outgoing mail is queued in the database and delivered by
+# `manage.py send_queued_mail`; MAIL_QUEUE['BACKEND'] does the real sending.
+# For a local SMTP stand-in use the smtp backend with EMAIL_PORT = 1025.
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+MAIL_QUEUE = {
+    'BACKEND': 'django.core.mail.backends.filebased.EmailBackend',
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 60,
+}
+
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -157,8 +194,141 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE are streamed to a temporary
+# file; a request whose files exceed UPLOAD_MAX_SIZE is rejected with 400.
+# Post images are checked by their header only (core.validators) before
+# anything decodes them.
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+UPLOAD_MAX_SIZE = 5 * 1024 * 1024
+
+IMAGE_UPLOAD = {
+    'FORMATS': ('JPEG', 'PNG', 'GIF', 'WEBP'),
+    'MAX_WIDTH': 8000,
+    'MAX_HEIGHT': 8000,
+    'MAX_PIXELS': 24000000,
+}
+
+
+# Sessions, cache-tag versions, counter buffers, throttle counters and the
+# versions of core.local_cache must be seen by every web worker and by the
+# management commands, so the default cache is shared between processes.
+# The process-local cache is only for development and tests, where one
+# process does everything; core.checks refuses it unless
+# CACHE_ALLOW_PROCESS_LOCAL is on.
+
+CACHE_ALLOW_PROCESS_LOCAL = DEBUG
+
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', '127.0.0.1:11211'),
+        }
+    }
+
+
+# Request throttling: requests per user or IP, keyed by URL name, counted
+# in a sliding window. Only POST requests count unless the rule lists its
+# methods: following and unfollowing are GET links that write to the
+# database and invalidate cache tags, so every request to them counts.
+
+THROTTLE_RATES = {
+    'posts:post_create': '30/m',
+    'posts:add_comment': '30/m',
+    'posts:post_like': '60/m',
+    'posts:post_unlike': '60/m',
+    'posts:profile_follow': {'rate': '30/m', 'methods': ('GET', 'POST')},
+    'posts:profile_unfollow': {'rate': '30/m', 'methods': ('GET', 'POST')},
+    'users:login': '30/m',
+    'users:signup': '30/m',
+}
+
+
+# Response compression: minimum body size per content type. Compressed
+# bodies of responses shared by many visitors (page cache hits, anonymous
+# pages without cookies or CSRF tokens) are cached by the hash of the
+# uncompressed content; other responses are compressed on every request.
+
+COMPRESSION_MIN_SIZES = {
+    'text/html': 1024,
+    'text/plain': 1024,
+    'text/xml': 512,
+    'application/json': 512,
+    'application/xml': 512,
+    'application/rss+xml': 512,
+    'application/atom+xml': 512,
+}
+COMPRESSION_CACHE_TIMEOUT = 600
+
+
+# Full-page cache for anonymous visitors, invalidated by tags from
+# posts.signals. Off in development so pages always reflect the code.
+
+PAGE_CACHE_ENABLED = not DEBUG
+PAGE_CACHE_TIMEOUT = 300
+
+
+# Cache-Control for a caching reverse proxy, per URL name, for anonymous
+# visitors; logged-in users always get "private, no-store". Responses carry
+# their cache tags in Surrogate-Key. Invalidated tags are queued in the
+# database and purged with a PURGE request to EDGE_CACHE['PURGE_URL'] by
+# the purge_edge_cache command, never from the request. Post pages served
+# by the proxy are not counted in post views.
+
+CACHE_POLICIES = {
+    'posts:index': {'max_age': 60, 'stale_while_revalidate': 300},
+    'posts:group_list': {'max_age': 60, 'stale_while_revalidate': 300},
+    'posts:profile': {'max_age': 60, 'stale_while_revalidate': 300},
+    'posts:tag_posts': {'max_age': 60, 'stale_while_revalidate': 300},
+    'posts:post_detail': {'max_age': 30, 'stale_while_revalidate': 120},
+    'posts:index_feed': {'max_age': 300, 'stale_while_revalidate': 600},
+    'posts:group_feed': {'max_age': 300, 'stale_while_revalidate': 600},
+    'posts:author_feed': {'max_age': 300, 'stale_while_revalidate': 600},
+    'posts:sitemap_index': {'max_age': 3600},
+    'posts:sitemap': {'max_age': 3600},
+}
+
+EDGE_CACHE = {
+    'PURGE_URL': None,
+    'TIMEOUT': 2,
+}
+
+
+# Static copies of the about pages and of the first pages of groups and
+# profiles for anonymous visitors, written as <path>/index.html under ROOT
+# for the front web server. Changed pages are queued by cache tag and
+# rewritten by `manage.py prerender_pages --loop`.
+
+PRERENDER = {
+    'ENABLED': False,
+    'ROOT': os.path.join(BASE_DIR, 'prerendered'),
+}
+
+
+# Share of post views counted in the buffered view counter (1 counts every
+# view); each sampled view is weighted by 1 / rate, rounded up or down at
+# random so that the expected count is unbiased.
+
+VIEW_COUNTER_SAMPLE_RATE = 1
+
+
+# Opt-in template render profiler: writes a folded-stacks file (for
+# flamegraph.pl or speedscope) for a sample of requests.
+
+TEMPLATE_PROFILER = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'OUTPUT_DIR': os.path.join(BASE_DIR, 'profiles'),
 }
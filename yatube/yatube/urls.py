@@ -23,6 +23,8 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('notifications/',
+         include('notifications.urls', namespace='notifications')),
     path('', include('posts.urls', namespace='group')),
 ]
 
@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+from core.checks import require_shared_cache  # noqa: E402
+
+require_shared_cache()
+
+if getattr(settings, 'WSGI_WARMUP', False):
+    from core.warmup import warm_up
+
+    warm_up()